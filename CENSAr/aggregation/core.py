@@ -6,6 +6,7 @@ import pandas as pd
 import geopandas as gpd
 
 from CENSAr.logging import get_logger
+from CENSAr.profiling import profile
 
 from .utils import Mapping, NamedAggregator, load_aggregation
 
@@ -34,6 +35,7 @@ def list_named_aggregations() -> list[str]:
     return list(ALL.keys())
 
 
+@profile(rows="data")
 def named_aggregation(
     data: pd.DataFrame | gpd.GeoDataFrame,
     name: str,
@@ -69,6 +71,7 @@ def named_aggregation(
     return data
 
 
+@profile(rows="data")
 def aggregate(
     data: gpd.GeoDataFrame | pd.DataFrame,
     schema: list[Mapping],
@@ -107,7 +110,7 @@ def aggregate(
     original_columns = data.columns
     for mapping in schema:
         mapping = Mapping(**mapping) if isinstance(mapping, dict) else mapping
-        columns = mapping.columns
+        columns = list(mapping.columns)
         if mapping.regex:
             for pattern in mapping.regex:
                 columns += list(filter(re.compile(pattern).match, data.columns))
@@ -1,9 +1,16 @@
 from copy import deepcopy
+from functools import lru_cache
 
+import numpy as np
+import pandas as pd
 import libpysal
+import shapely
 import geopandas as gpd
 import h3pandas  # noqa
 
+from CENSAr.datasources import CARTO_DIR, radios_prov
+from CENSAr.profiling import profile
+
 
 def geopandas_to_h3(
     gdf: gpd.GeoDataFrame,
@@ -31,9 +38,21 @@ def geopandas_to_h3(
         return gdf.h3.polyfill(resolution=resolution)
 
 
-def compute_weights(gdf: gpd.GeoDataFrame, weights: str = "queen", knn_k: int = 5):
+@profile(rows="gdf")
+def compute_weights(
+    gdf: gpd.GeoDataFrame,
+    weights: str = "queen",
+    knn_k: int = 5,
+    ids: str | None = None,
+    prov: str | None = None,
+    year: int | None = None,
+    root: str = CARTO_DIR,
+):
     """
-    This function takes a geopandas GeoDataFrame and returns a libpysal weights object
+    This function takes a geopandas GeoDataFrame and returns a libpysal weights object.
+    With `prov` and `year`, contiguity weights are sliced from the province weights
+    (built once per session, see `province_weights`) instead of built from scratch,
+    so the clipped tract sets of every year and scenario share one build.
     Parameters:
     gdf (geopandas.GeoDataFrame):
         GeoDataFrame with geometries
@@ -41,15 +60,131 @@ def compute_weights(gdf: gpd.GeoDataFrame, weights: str = "queen", knn_k: int =
         Spatial weights type. Default: "queen"
     knn_k (int):
         Number of neighbors for KNN weights. Default: 5
+    ids (str). Default: None
+        Name of the column used to identify each observation (e.g. "link")
+    prov (str). Default: None
+        Province of the tracts as used by `radios_prov` (e.g. "chaco")
+    year (int). Default: None
+        Census year of the tract geometries. Used together with `prov`
+    root (str):
+        Cartography directory of the province tracts
 
     Returns:
     libpysal.weights : libpysal weights object
     """
+    if prov is not None and year is not None and weights in ("queen", "rook"):
+        idx_col = ids or "link"
+        base_w, base_gdf = province_weights(prov, int(year), weights, idx_col, root)
+        return weights_from_base(base_w, gdf, idx_col, base_gdf, weights)
+
     match weights:
         case "queen":
-            w = libpysal.weights.Queen.from_dataframe(gdf)
+            w = libpysal.weights.Queen.from_dataframe(gdf, ids=ids)
+        case "rook":
+            w = libpysal.weights.Rook.from_dataframe(gdf, ids=ids)
         case "knn":
-            w = libpysal.weights.KNN.from_dataframe(gdf, k=knn_k)
+            w = libpysal.weights.KNN.from_dataframe(gdf, k=knn_k, ids=ids)
         case _:
             raise ValueError(f"Invalid weights type: {weights}")
     return w
+
+
+@lru_cache(maxsize=8)
+@profile()
+def province_weights(
+    prov: str,
+    year: int,
+    weights: str = "queen",
+    idx_col: str = "link",
+    root: str = CARTO_DIR,
+):
+    """
+    This function builds (once per session) the contiguity weights for every tract
+    of a province, to be sliced by `weights_from_base` for clipped tract sets.
+    Parameters:
+    prov (str):
+        Province name as used by `radios_prov` (e.g. "chaco")
+    year (int):
+        Census year of the tract geometries
+    weights (str):
+        Contiguity type, "queen" or "rook". Default: "queen"
+    idx_col (str):
+        Name of the tracts index column. Default: "link"
+    root (str):
+        Cartography directory
+
+    Returns:
+    tuple : libpysal weights object and the province GeoDataFrame it was built on
+    """
+    base_gdf = radios_prov(year=year, prov=prov, root=root)
+    base_w = compute_weights(base_gdf, weights=weights, ids=idx_col)
+    return base_w, base_gdf
+
+
+@profile(rows="gdf")
+def weights_from_base(
+    base_w,
+    gdf: gpd.GeoDataFrame,
+    idx_col: str = "link",
+    base_gdf: gpd.GeoDataFrame | None = None,
+    weights: str = "queen",
+    area_tolerance: float = 1e-6,
+):
+    """
+    This function derives contiguity weights for a subset of tracts from a cached
+    weights object built for the whole province. The base matrix is sliced by rows
+    and columns and neighbors are only re-evaluated for the tracts whose geometry
+    was modified by the clip (those along the footprint boundary).
+    Parameters:
+    base_w (libpysal.weights.W):
+        Contiguity weights built with `ids=idx_col` over the province tracts
+    gdf (geopandas.GeoDataFrame):
+        Subset of tracts (e.g. tracts clipped by an urban footprint)
+    idx_col (str):
+        Name of the tracts index column. Default: "link"
+    base_gdf (geopandas.GeoDataFrame). Default: None
+        Province tracts used to build `base_w`. If None, every tract of the subset
+        is assumed to keep its original geometry
+    weights (str):
+        Contiguity type of `base_w`, "queen" or "rook". Default: "queen"
+    area_tolerance (float):
+        Relative area loss above which a tract is considered clipped. Default: 1e-6
+
+    Returns:
+    libpysal.weights : libpysal weights object indexed by `idx_col`
+    """
+    if weights not in ("queen", "rook"):
+        raise ValueError(f"Incremental weights are only defined for contiguity, got: {weights}")
+
+    ids = gdf[idx_col].to_numpy()
+    base_ids = pd.Index(base_w.id_order)
+    pos = base_ids.get_indexer(ids)
+    if (pos < 0).any():
+        raise ValueError(f"Tracts not found in base weights: {ids[pos < 0][:10].tolist()}")
+
+    sparse = base_w.sparse.tocsr()[pos][:, pos].tocoo()
+    sparse.data[:] = 1
+
+    if base_gdf is not None:
+        base_area = (
+            base_gdf.set_index(idx_col).geometry.area.reindex(ids).to_numpy()
+        )
+        area = gdf.to_crs(base_gdf.crs).geometry.area.to_numpy()
+        clipped = area < base_area * (1 - area_tolerance)
+
+        # clipping only removes adjacencies, so only the edges touching a
+        # clipped tract need to be checked again
+        check = clipped[sparse.row] | clipped[sparse.col]
+        if check.any():
+            geoms = gdf.geometry.to_numpy()
+            a, b = geoms[sparse.row[check]], geoms[sparse.col[check]]
+            if weights == "queen":
+                keep = shapely.intersects(a, b)
+            else:
+                keep = shapely.relate_pattern(a, b, "****1****")
+            sparse.data[np.flatnonzero(check)[~keep]] = 0
+            sparse.eliminate_zeros()
+
+    return libpysal.weights.WSP(sparse.tocsr(), id_order=ids.tolist()).to_W(
+        silence_warnings=True
+    )
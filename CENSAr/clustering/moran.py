@@ -1,3 +1,4 @@
+import numpy as np
 import geopandas as gpd
 from esda.moran import (
     Moran, 
@@ -7,6 +8,7 @@ from esda.moran import (
     )
 
 from CENSAr.clustering.geo_utils import compute_weights
+from CENSAr.profiling import profile
 
 # Mapping from value to name (as a dict)
 MORAN_LABELS = {
@@ -18,12 +20,16 @@ MORAN_LABELS = {
 }
 
 
+@profile(rows="gdf")
 def lisa(
     gdf: gpd.GeoDataFrame,
     indicators: list[str],
     weights: str = "queen",
     knn_k: int = 5,
-    local: bool = True
+    local: bool = True,
+    w=None,
+    prov: str | None = None,
+    year: int | None = None,
 ):
     """
     This function takes a geopandas GeoDataFrame and estimates the 
@@ -39,11 +45,19 @@ def lisa(
         Number of neighbors for KNN weights. Default: 5
     local (bool). Default: True
         Wether to return local or global Moran
+    w (libpysal.weights.W). Default: None
+        Precomputed weights. If given, `weights` and `knn_k` are ignored
+    prov (str). Default: None
+        Province of the tracts. With `year`, contiguity weights are sliced from
+        the cached province weights (see `compute_weights`)
+    year (int). Default: None
+        Census year of the tract geometries
 
     Returns:
     list : esda.Moran or esda.Moran_Local objects
     """
-    w = compute_weights(gdf, weights=weights, knn_k=knn_k)
+    if w is None:
+        w = compute_weights(gdf, weights=weights, knn_k=knn_k, prov=prov, year=year)
     
     if local:
         return [Moran_Local(gdf[indicator], w) for indicator in indicators]
@@ -51,6 +65,7 @@ def lisa(
         # global
         return [Moran(gdf[indicator].values, w) for indicator in indicators]
 
+@profile(rows="gdf")
 def lisa_bv(
     gdf: gpd.GeoDataFrame,
     target_attr: str,
@@ -58,6 +73,9 @@ def lisa_bv(
     weights: str = "queen",
     knn_k: int = 5,
     local: bool = True,
+    w=None,
+    prov: str | None = None,
+    year: int | None = None,
 ):
     """
     This function takes a geopandas GeoDataFrame and estimates the 
@@ -75,12 +93,19 @@ def lisa_bv(
         Number of neighbors for KNN weights. Default: 5
     local (bool). Default: True:
         Wether to return local or global statistic
-    
+    w (libpysal.weights.W). Default: None
+        Precomputed weights. If given, `weights` and `knn_k` are ignored
+    prov (str). Default: None
+        Province of the tracts. With `year`, contiguity weights are sliced from
+        the cached province weights (see `compute_weights`)
+    year (int). Default: None
+        Census year of the tract geometries
 
     Returns:
     esda.Moran_BV | esda.Moran_Local: bivariate spatial autocorrelation objects
     """
-    w = compute_weights(gdf, weights=weights, knn_k=knn_k)
+    if w is None:
+        w = compute_weights(gdf, weights=weights, knn_k=knn_k, prov=prov, year=year)
     
     if local:
         return Moran_Local_BV(gdf[target_attr], gdf[reference_attr], w)
@@ -88,4 +113,136 @@ def lisa_bv(
     else:
         # global
         return Moran_BV(gdf[target_attr], gdf[reference_attr], w)
-    
\ No newline at end of file
+    
+
+def _row_standardized(w):
+    """
+    Returns the row standardized sparse matrix of a libpysal weights object
+    without modifying the transformation of the original object.
+    """
+    sparse = w.sparse.tocsr().astype(float)
+    row_sums = np.asarray(sparse.sum(axis=1)).ravel()
+    row_sums[row_sums == 0] = 1
+    scale = np.repeat(1 / row_sums, np.diff(sparse.indptr))
+    sparse.data = sparse.data * scale
+    return sparse
+
+
+def _standardize(values: np.ndarray) -> np.ndarray:
+    """
+    Column-wise z-scores using the population standard deviation (as esda does).
+    """
+    values = values - values.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values / values.std(axis=0)
+
+
+@profile(rows="gdf")
+def lisa_bv_batch(
+    gdf: gpd.GeoDataFrame,
+    target_attrs: list[str],
+    reference_attrs: list[str],
+    pairs: list[tuple[str, str]] | None = None,
+    weights: str = "queen",
+    knn_k: int = 5,
+    w=None,
+    prov: str | None = None,
+    year: int | None = None,
+    permutations: int = 999,
+    seed: int | None = None,
+    chunk_size: int = 2_000_000,
+):
+    """
+    This function takes a geopandas GeoDataFrame and estimates the bivariate local
+    spatial autocorrelation for many (target, reference) pairs at once. Spatial lags
+    of every reference column are computed with one sparse product and the
+    conditional permutation draws are shared across all the pairs.
+    Parameters:
+    gdf (geopandas.GeoDataFrame):
+        GeoDataFrame with geometries
+    target_attrs (list[str]):
+        Names of the columns with observations
+    reference_attrs (list[str]):
+        Names of the columns representing neighboors reference
+    pairs (list[tuple[str, str]]). Default: None
+        Explicit (target_attr, reference_attr) pairs to evaluate. If None, every
+        target is crossed with every reference
+    weights (str):
+        Spatial weights type. Default: "queen"
+    knn_k (int):
+        Number of neighbors for KNN weights. Default: 5
+    w (libpysal.weights.W). Default: None
+        Precomputed weights. If given, `weights` and `knn_k` are ignored
+    prov (str). Default: None
+        Province of the tracts. With `year`, contiguity weights are sliced from
+        the cached province weights (see `compute_weights`)
+    year (int). Default: None
+        Census year of the tract geometries
+    permutations (int):
+        Number of conditional permutations. Default: 999
+    seed (int). Default: None
+        Seed of the permutation draws
+    chunk_size (int):
+        Maximum number of simulated values held in memory at once. Default: 2_000_000
+
+    Returns:
+    dict : with the keys
+        - pairs: list of (target_attr, reference_attr) tuples (P)
+        - Is: (P, n) array of local bivariate Moran statistics
+        - p_sim: (P, n) array of pseudo p-values
+        - q: (P, n) array of quadrants (1 HH, 2 LH, 3 LL, 4 HL)
+        - lag: (R, n) array with the spatial lag of each standardized reference
+    """
+    if pairs is None:
+        pairs = [(t, r) for t in target_attrs for r in reference_attrs]
+    targets = list(dict.fromkeys(t for t, _ in pairs))
+    references = list(dict.fromkeys(r for _, r in pairs))
+    t_pos = np.array([targets.index(t) for t, _ in pairs])
+    r_pos = np.array([references.index(r) for _, r in pairs])
+
+    if w is None:
+        w = compute_weights(gdf, weights=weights, knn_k=knn_k, prov=prov, year=year)
+    sparse = _row_standardized(w)
+
+    zx = _standardize(gdf[targets].to_numpy(dtype=float))
+    zy = _standardize(gdf[references].to_numpy(dtype=float))
+    n = zx.shape[0]
+
+    # one sparse product for every reference column
+    lag = sparse @ zy
+    Is = ((n - 1) / n) * (zx[:, t_pos] * lag[:, r_pos]).T
+
+    zp = zx[:, t_pos].T > 0
+    lp = lag[:, r_pos].T > 0
+    q = 1 * (zp & lp) + 2 * (~zp & lp) + 3 * (~zp & ~lp) + 4 * (zp & ~lp)
+
+    p_sim = np.full(Is.shape, np.nan)
+    if permutations:
+        cardinalities = np.diff(sparse.indptr)
+        max_card = cardinalities.max()
+        rng = np.random.default_rng(seed)
+        # draws shared by every observation and pair (as esda's conditional randomization)
+        permuted_ids = np.stack(
+            [rng.choice(n - 1, size=max_card, replace=False) for _ in range(permutations)]
+        )
+        larger = np.zeros(Is.shape, dtype=int)
+
+        for k in np.unique(cardinalities[cardinalities > 0]):
+            rows = np.flatnonzero(cardinalities == k)
+            step = max(1, chunk_size // (permutations * k * len(references)))
+            for start in range(0, len(rows), step):
+                chunk = rows[start : start + step]
+                ids = permuted_ids[None, :, :k]
+                # skip the observation itself
+                ids = ids + (ids >= chunk[:, None, None])
+                w_i = sparse.data[sparse.indptr[chunk][:, None] + np.arange(k)]
+                sim_lag = np.einsum("ipkr,ik->ipr", zy[ids], w_i)
+                sim = ((n - 1) / n) * zx[chunk][:, None, t_pos] * sim_lag[:, :, r_pos]
+                larger[:, chunk] = (sim >= Is[:, chunk].T[:, None, :]).sum(axis=1).T
+
+        low_extreme = (permutations - larger) < larger
+        larger[low_extreme] = permutations - larger[low_extreme]
+        p_sim = (larger + 1.0) / (permutations + 1.0)
+        p_sim[:, cardinalities == 0] = np.nan
+
+    return {"pairs": pairs, "Is": Is, "p_sim": p_sim, "q": q, "lag": lag.T}
@@ -1,10 +1,13 @@
 import os
 import unicodedata
+from functools import lru_cache
 
 import pandas as pd
 import geopandas as gpd
 
 from CENSAr.logging import get_logger
+from CENSAr.profiling import profile
+from CENSAr.spatial_distributions.geo_utils import read_geo_csv
 
 logger = get_logger(__name__)
 
@@ -46,9 +49,29 @@ def radios_caba_2010(root=CARTO_DIR):
     return gpd.read_file(path)
 
 
+@lru_cache(maxsize=32)
+@profile()
+def read_layer(path):
+    """
+    Reads (once per process) a vector layer. The cached frame is shared and
+    must be treated as read-only: callers get copies or clipped subsets.
+    """
+    logger.info(f"loading `{path}`")
+    return gpd.read_file(path)
+
+
+def preload_layers(layers, root=CARTO_DIR):
+    """
+    layers (list[tuple]): (year, prov) pairs of provincial tracts to keep in memory
+    """
+    for year, prov in layers:
+        read_layer(f"{root}/radios_{year}_{prov}.zip")
+
+
+@profile()
 def radios_prov(year, prov, root=CARTO_DIR, mask=None):
     path = f"{root}/radios_{year}_{prov}.zip"
-    radios = gpd.read_file(path)
+    radios = read_layer(path).copy()
 
     if mask is not None:
         if mask.crs != radios.crs:
@@ -58,13 +81,14 @@ def radios_prov(year, prov, root=CARTO_DIR, mask=None):
     return radios
 
 
+@profile()
 def radios_precenso_2020(root=CARTO_DIR, geo_filter=None, mask=None):
     """
     geo_filter (dict): nomprov + nomdepto (e.g. {'prov':'18', 'depto':'021'})
     mask (Polygon): shapely's polygon geometry
     """
     path = f"{root}/radios_precenso_2020.zip"
-    radios = gpd.read_file(path)
+    radios = read_layer(path).copy()
 
     # 1. Filtra radios dentro del departamento
     if geo_filter is not None:
@@ -106,6 +130,7 @@ def radios_eph_censo_2010(aglo_idx, root=CARTO_DIR):
     return mask_wgs.dissolve(by="cons")
 
 
+@profile()
 def tipoviv_radios_prov(year, prov, var_types, root=DATA_DIR):
     path = f"{root}/tipo_vivienda_radios_{prov}_{year}.csv"
     logger.info(f"loading `{path}`")
@@ -128,6 +153,7 @@ def desagueinod_radios_prov(year, prov, var_types, root=DATA_DIR):
     return desagueinod_radio
 
 
+@profile()
 def personas_radios_prov(year, prov, var_types, root=DATA_DIR):
     path = f"{root}/personas_radios_{prov}_{year}.csv"
     logger.info(f"loading `{path}`")
@@ -153,6 +179,7 @@ def inmat_radios_caba_2010(root=DATA_DIR):
     return pd.read_csv(path)
 
 
+@profile()
 def tracts_matching_0110(prov, var_types, root=DATA_DIR):
     filename = f"{prov}_tracts_pairing_0110.csv"
     path = os.path.join(root, filename)
@@ -161,6 +188,22 @@ def tracts_matching_0110(prov, var_types, root=DATA_DIR):
     return pd.read_csv(path, dtype=var_types)
 
 
+@lru_cache(maxsize=4)
+def _informal_settlements(path, chunksize):
+    logger.info(f"loading `{path}`")
+    return read_geo_csv(path, geom_column="geometry", chunksize=chunksize)
+
+
+@profile()
+def informal_settlements(root=DATA_DIR, version="072022", chunksize=None):
+    """
+    RENABAP informal settlements polygons. The parsed layer is cached by
+    process, callers get a copy.
+    """
+    path = f"{root}/informal_settlements_{version}.csv"
+    return _informal_settlements(path, chunksize).copy()
+
+
 def persproy_depto_2025(prov, root=DATA_DIR):
     filename = f"persproyect_depto_{prov}.csv"
     path = os.path.join(root, filename)
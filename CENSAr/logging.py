@@ -1,11 +1,17 @@
 import os
 import sys
+import json
+import time
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing.util import Finalize
 
 from rich.logging import RichHandler
 
 LOG_PATH = os.getenv("CENSAR_LOG_PATH", "")
 LOG_LEVEL = os.getenv("CENSAR_LOG_LEVEL", "info")
+LOG_FORMAT = os.getenv("CENSAR_LOG_FORMAT", "text")
 LOG_LEVEL_MAP = {
     "debug": logging.DEBUG,
     "info": logging.INFO,
@@ -13,27 +19,192 @@ LOG_LEVEL_MAP = {
     "error": logging.ERROR,
 }
 
+ROOT_LOGGER = "CENSAr"
 
-def get_logger(name: str) -> logging.Logger:
-    if LOG_PATH:
-        logging.basicConfig(
-            filename=LOG_PATH,
-            level=LOG_LEVEL_MAP.get(LOG_LEVEL, "info"),
+# attributes of every LogRecord, the remaining ones are structured fields (extra=)
+_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "markup"}
+
+_STATE = {"pid": None, "listener": None, "finalizer": None}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as json lines with the time, level, logger, process and
+    message, plus the structured fields passed with `extra`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        payload.update(
+            {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
         )
-    else:
-        logging.basicConfig(
-            level=LOG_LEVEL_MAP.get(LOG_LEVEL, "info"),
-            format="%(message)s",
-            datefmt="[%X]",
-            handlers=[RichHandler(markup=True)],
+        return json.dumps(payload, default=str)
+
+
+def _output_handler(path: str, fmt: str) -> logging.Handler:
+    if path:
+        handler = logging.FileHandler(path)
+        formatter = (
+            JsonFormatter()
+            if fmt == "json"
+            else logging.Formatter("%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
         )
+    elif fmt == "json":
+        handler = logging.StreamHandler(sys.stderr)
+        formatter = JsonFormatter()
+    else:
+        handler = RichHandler(markup=True)
+        formatter = logging.Formatter("%(message)s", datefmt="[%X]")
+    handler.setFormatter(formatter)
+    return handler
+
+
+class _ProcessQueueHandler(QueueHandler):
+    # a forked process gets its own queue and listener on its first record
+    def enqueue(self, record):
+        if _STATE["pid"] != os.getpid():
+            configure_logging(force=True).handlers[0].enqueue(record)
+        else:
+            super().enqueue(record)
+
+
+def _stop_listener():
+    listener = _STATE["listener"]
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+    _STATE["listener"] = None
+
+
+def configure_logging(
+    level: str | None = None,
+    path: str | None = None,
+    fmt: str | None = None,
+    force: bool = False,
+) -> logging.Logger:
+    """
+    Configures the package logger once by process. Records are put in an
+    in-memory queue (the caller never waits on I/O) and written by a listener
+    thread to the console (rich) or to a log file. The root logger, stdout
+    and stderr are left untouched.
+
+    Parameters
+    ----------
+    level : str, default None
+        One of debug, info, warning or error. `CENSAR_LOG_LEVEL` by default.
+    path : str, default None
+        Log file appended by every process. `CENSAR_LOG_PATH` by default,
+        the console when empty.
+    fmt : str, default None
+        'text' or 'json' (one structured record by line). `CENSAR_LOG_FORMAT`
+        by default.
+    force : bool, default False
+        Whether to configure the logger again in an already configured process.
+
+    Returns
+    -------
+    logger:logging.Logger
+        Package logger.
+    """
+    logger = logging.getLogger(ROOT_LOGGER)
+    if _STATE["pid"] == os.getpid() and not force:
+        return logger
 
-    logger = logging.getLogger(name)
+    level = LOG_LEVEL if level is None else level
+    path = LOG_PATH if path is None else path
+    fmt = LOG_FORMAT if fmt is None else fmt
+    if fmt not in ("text", "json"):
+        raise ValueError(f"Unknown log format `{fmt}`, use 'text' or 'json'")
 
-    if LOG_PATH:
-        sys.stdout.write = logger.debug
-        sys.stdout.write = logger.info
-        sys.stdout.write = logger.warning
-        sys.stderr.write = logger.error
+    if _STATE["pid"] == os.getpid():
+        _stop_listener()
+    if _STATE["finalizer"] is not None:
+        _STATE["finalizer"].cancel()
 
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, _output_handler(path, fmt), respect_handler_level=True)
+    listener.start()
+
+    logger.handlers = [_ProcessQueueHandler(records)]
+    logger.setLevel(LOG_LEVEL_MAP.get(level, logging.INFO))
+    logger.propagate = False
+
+    _STATE.update(pid=os.getpid(), listener=listener)
+    # flushed on exit, also in multiprocessing workers (which skip atexit)
+    _STATE["finalizer"] = Finalize(None, _stop_listener, exitpriority=0)
     return logger
+
+
+def _after_fork():
+    # the listener thread is not copied into forked processes
+    _STATE.update(listener=None, finalizer=None)
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    if name != ROOT_LOGGER and not name.startswith(f"{ROOT_LOGGER}."):
+        name = f"{ROOT_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+
+class ProgressLogger:
+    """
+    Rate-limited progress records: at most one every `interval` seconds
+    (plus the last one), so progress of many small tasks does not flood the
+    log.
+
+    ...
+
+    Attributes
+    ----------
+    logger : logging.Logger
+        Logger the progress records are sent to.
+    total : int
+        Number of expected steps.
+    label : str
+        Name of the task.
+    interval : float
+        Minimum seconds between records.
+
+    Methods
+    -------
+    update(n, **fields):
+        Adds finished steps, logging them if the interval has elapsed.
+    """
+
+    def __init__(self, logger: logging.Logger, total: int, label: str, interval: float = 5.0):
+        self.logger = logger
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.done = 0
+        self._start = self._last = time.perf_counter()
+
+    def update(self, n: int = 1, **fields):
+        """
+        Adds `n` finished steps. Extra fields are sent as structured fields.
+        """
+        self.done += n
+        now = time.perf_counter()
+        if now - self._last < self.interval and self.done < self.total:
+            return
+        self._last = now
+        elapsed = now - self._start
+        self.logger.info(
+            f"{self.label}: {self.done}/{self.total} in {elapsed:.1f}s",
+            extra={
+                "progress": self.done,
+                "total": self.total,
+                "elapsed": round(elapsed, 3),
+                "rate": round(self.done / elapsed, 3) if elapsed else None,
+                **fields,
+            },
+        )
@@ -6,10 +6,12 @@ import geopandas as gpd
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
 from matplotlib.figure import Figure
-import esda
 from splot import esda as esdaplot
 
 from CENSAr.clustering.geo_utils import compute_weights
+from CENSAr.clustering.moran import lisa, lisa_bv
+from CENSAr.simplification import plotting_layer
+from CENSAr.rasterization import plot_raster
 
 
 def compare_chropleths(
@@ -20,6 +22,8 @@ def compare_chropleths(
     figsize: tuple[int, int] = (12, 8),
     SRID: int | str = 4326, 
     legend_kwds: dict[str, Any] = {"shrink": 0.3},
+    simplify: bool | float = True,
+    raster: bool = False,
     **kwargs,
 ) -> Figure:
     """
@@ -42,6 +46,15 @@ def compare_chropleths(
         Coordinates reference system.
     legend_kwds : dict, default {"shrink": 0.3}
         Legend settings.
+    simplify : bool | float, default True
+        Whether to draw geometries simplified to the size of one pixel of each
+        map (cached by layer, SRID and tolerance, see `CENSAr.simplification`).
+        A number is used as tolerance in SRID units.
+    raster : bool, default False
+        Whether to draw the choropleths as images burned at the figure
+        resolution (see `CENSAr.rasterization.plot_raster`), for layers with
+        too many polygons (e.g. national tracts or H3 grids). Colormaps and
+        classification schemes are the same.
     **kwargs: Aditional plotting config.
         e.g. scheme (str): "Quantiles"
 
@@ -63,16 +76,22 @@ def compare_chropleths(
 
     kwargs["legend"] = kwargs.get("legend", True)
     kwargs["legend_kwds"] = legend_kwds
-    
-    print(kwargs)
 
+    axsize = (figsize[0] / nplots, figsize[1])
     for gdf, ax, column in zip(gdfs, axes, column):
-        gdf.to_crs(SRID).plot(ax=ax, column=column, **kwargs)
+        if raster:
+            # pixel centers are burned from full resolution geometries
+            gdf = plotting_layer(gdf, SRID, False)
+            plot_raster(gdf, column, ax=ax, axsize=axsize, **kwargs)
+        else:
+            gdf = plotting_layer(gdf, SRID, simplify, figsize=axsize)
+            gdf.plot(ax=ax, column=column, **kwargs)
 
     if urban_boundaries:
         idx = 0
         for gdf in urban_boundaries:
-            gdf.to_crs(SRID).geometry.boundary.plot(ax=axes[idx], linewidth=0.1, color='black')
+            gdf = plotting_layer(gdf, SRID, simplify, figsize=axsize)
+            gdf.geometry.boundary.plot(ax=axes[idx], linewidth=0.1, color='black')
             idx += 1
 
     for ax in axes:
@@ -279,8 +298,12 @@ def plot_local_autocorrelation(
     knn_k: int = 5,
     figsize: tuple[int, int] = (20, 7),
     cmap: str = "viridis",
+    w=None,
+    lisas: list | dict | None = None,
+    prov: str | None = None,
+    year: int | None = None,
     **kwargs,
-):
+) -> list[Figure]:
     """
     Plot local autocorrelation for each indicator in the list.
 
@@ -300,17 +323,36 @@ def plot_local_autocorrelation(
         Figure size, by default (20, 7).
     cmap : str, optional
         Colormap to use, by default "viridis".
+    w : libpysal.weights.W, optional
+        Precomputed weights. If given, `weights` and `knn_k` are ignored.
+        Otherwise they are built once for all the indicators.
+    lisas : list | dict, optional
+        Precomputed `esda.Moran_Local` results (e.g. from `lisa`), in the
+        order of `indicators` or by indicator. Otherwise all the indicators
+        are estimated in one `lisa` call.
+    prov : str, optional
+        Province of the tracts. With `year`, contiguity weights are sliced
+        from the cached province weights (see `compute_weights`).
+    year : int, optional
+        Census year of the tract geometries.
 
     Returns
     -------
-    Figure
-        Figure with the plots.
+    list[Figure]
+        One figure by indicator.
     """
-    for indicator in indicators:
-        w = compute_weights(gdf, weights=weights, knn_k=knn_k)
-        lisa = esda.Moran_Local(gdf[indicator], w)
+    if lisas is None:
+        if w is None:
+            w = compute_weights(gdf, weights=weights, knn_k=knn_k, prov=prov, year=year)
+        lisas = lisa(gdf, indicators, w=w)
+    elif isinstance(lisas, dict):
+        lisas = [lisas[indicator] for indicator in indicators]
+    assert len(lisas) == len(indicators), "one LISA result for every indicator must be definided."
+
+    figs = []
+    for indicator, moran_loc in zip(indicators, lisas):
         fig, subplots = esdaplot.plot_local_autocorrelation(
-            lisa,
+            moran_loc,
             gdf,
             indicator,
             p=p_value,
@@ -319,6 +361,8 @@ def plot_local_autocorrelation(
             **kwargs,
         )
         fig.suptitle(f"{indicator.capitalize()} - Local Autocorrelation")
+        figs.append(fig)
+    return figs
 
 
 def plot_local_autocorrelation_bv(
@@ -330,12 +374,54 @@ def plot_local_autocorrelation_bv(
     knn_k: int = 5,
     figsize: tuple[int, int] = (20, 7),
     cmap: str = "viridis",
+    w=None,
+    moran_loc=None,
+    prov: str | None = None,
+    year: int | None = None,
     **kwargs,
-):
-    w = compute_weights(gdf, weights=weights, knn_k=knn_k)
-    lisa_bv = esda.Moran_Local_BV(gdf[target_attr], gdf[reference_attr], w)
+) -> Figure:
+    """
+    Plot bivariate local autocorrelation between two attributes.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        GeoDataFrame with the data.
+    target_attr : str
+        Name of the column with observations.
+    reference_attr : str
+        Name of the column representing neighbours reference.
+    p_value : float, optional
+        P-value for the local autocorrelation, by default 0.05.
+    weights : str, optional
+        Weights to use, by default "queen".
+    knn_k : int, optional
+        Number of neighbors to use when weights is "knn", by default 5.
+    figsize : tuple[int, int], optional
+        Figure size, by default (20, 7).
+    cmap : str, optional
+        Colormap to use, by default "viridis".
+    w : libpysal.weights.W, optional
+        Precomputed weights. If given, `weights` and `knn_k` are ignored.
+    moran_loc : esda.Moran_Local_BV, optional
+        Precomputed result (e.g. from `lisa_bv`).
+    prov : str, optional
+        Province of the tracts. With `year`, contiguity weights are sliced
+        from the cached province weights (see `compute_weights`).
+    year : int, optional
+        Census year of the tract geometries.
+
+    Returns
+    -------
+    Figure
+        Figure with the plots.
+    """
+    if moran_loc is None:
+        moran_loc = lisa_bv(
+            gdf, target_attr, reference_attr, weights=weights, knn_k=knn_k, w=w, prov=prov, year=year
+        )
     fig, subplots = esdaplot.plot_local_autocorrelation(
-        lisa_bv,
+        moran_loc,
         gdf,
         target_attr,
         p=p_value,
@@ -346,3 +432,4 @@ def plot_local_autocorrelation_bv(
     fig.suptitle(
         f"{target_attr.capitalize()} - {reference_attr.capitalize()}\nBivariate Local Autocorrelation"  # noqa
     )
+    return fig
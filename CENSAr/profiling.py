@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from CENSAr.logging import get_logger
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+logger = get_logger(__name__)
+
+PROFILE = os.getenv("CENSAR_PROFILE", "").lower() not in ("", "0", "false")
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process in MB (NaN if unavailable).
+    """
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 1024**2 if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def _count_rows(value):
+    if hasattr(value, "shape") and len(getattr(value, "shape")):
+        return int(value.shape[0])
+    if isinstance(value, list):
+        return len(value)
+    return None
+
+
+class Tracer:
+    """
+    Collects timing and memory records of instrumented stages.
+
+    ...
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether spans are recorded (`CENSAR_PROFILE` environment variable).
+    records : list[dict]
+        One record by finished span: name, start, wall and cpu time (s), peak
+        RSS and its growth during the span (MB), rows, process, thread, depth
+        and extra attributes.
+
+    Methods
+    -------
+    span(name, rows, **attrs):
+        Context manager recording a stage.
+    summary():
+        Aggregated records by stage name.
+    to_json(path):
+        Exports the records as a json trace.
+    to_chrome_trace(path):
+        Exports the records in Chrome trace format (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, enabled: bool = PROFILE):
+        self.enabled = enabled
+        self.records: list[dict] = []
+        self._origin = time.perf_counter()
+        self._epoch = time.time()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.records = []
+
+    def extend(self, records: list[dict]):
+        """
+        Adds records collected in another process (e.g. scenario workers).
+        """
+        self.records.extend(records)
+
+    @contextmanager
+    def span(self, name: str, rows: int | None = None, **attrs):
+        """
+        Records the wall time, cpu time, peak RSS and rows of a block.
+        The yielded dict can be updated inside the block (e.g. record["rows"] = n).
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        record = {"name": name, "rows": rows, **attrs}
+        rss_start = peak_rss_mb()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            end_wall = time.perf_counter()
+            self._local.depth = depth
+            rss_end = peak_rss_mb()
+            record.update(
+                start=self._epoch + (start_wall - self._origin),
+                wall_time=end_wall - start_wall,
+                cpu_time=time.process_time() - start_cpu,
+                peak_rss_mb=rss_end,
+                rss_growth_mb=rss_end - rss_start,
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+                depth=depth,
+            )
+            self.records.append(record)
+            logger.debug(
+                f"{name}: {record['wall_time']:.3f}s wall, {record['cpu_time']:.3f}s cpu, "
+                f"{record['peak_rss_mb']:.0f}MB peak rss, rows={record['rows']}"
+            )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns calls, total and mean wall/cpu time, max peak RSS and rows by stage.
+        """
+        records = pd.DataFrame(self.records)
+        if records.empty:
+            return records
+        return (
+            records.groupby("name")
+            .agg(
+                calls=("wall_time", "size"),
+                wall_time=("wall_time", "sum"),
+                mean_wall_time=("wall_time", "mean"),
+                cpu_time=("cpu_time", "sum"),
+                peak_rss_mb=("peak_rss_mb", "max"),
+                rss_growth_mb=("rss_growth_mb", "sum"),
+                rows=("rows", "sum"),
+            )
+            .sort_values("wall_time", ascending=False)
+        )
+
+    def to_json(self, path: str) -> str:
+        with open(path, "w") as f:
+            json.dump({"records": self.records}, f, default=str, indent=1)
+        return path
+
+    def to_chrome_trace(self, path: str) -> str:
+        events = [
+            {
+                "name": record["name"],
+                "ph": "X",
+                "ts": record["start"] * 1e6,
+                "dur": record["wall_time"] * 1e6,
+                "pid": record["pid"],
+                "tid": record["tid"],
+                "args": {
+                    k: v
+                    for k, v in record.items()
+                    if k not in ("name", "start", "wall_time", "pid", "tid")
+                },
+            }
+            for record in self.records
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+        return path
+
+
+TRACER = Tracer()
+
+
+def span(name: str, rows: int | None = None, **attrs):
+    """
+    Context manager recording a block in the session tracer.
+
+    Parameters
+    ----------
+    name : str
+        Stage name.
+    rows : int, default None
+        Number of rows processed by the stage.
+    **attrs
+        Extra attributes stored with the record.
+    """
+    return TRACER.span(name, rows=rows, **attrs)
+
+
+def profile(name: str | None = None, rows: str | None = None):
+    """
+    Decorator recording every call of a function in the session tracer. When
+    profiling is disabled the only overhead is a flag check.
+
+    Parameters
+    ----------
+    name : str, default None
+        Stage name. The function qualified name by default.
+    rows : str, default None
+        Name of the argument whose length is recorded as rows. By default, the
+        length of the returned value.
+    """
+
+    def decorator(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+
+            n_rows = None
+            if rows is not None:
+                bound = signature.bind_partial(*args, **kwargs)
+                n_rows = _count_rows(bound.arguments.get(rows))
+            with TRACER.span(label, rows=n_rows) as record:
+                result = func(*args, **kwargs)
+                if rows is None:
+                    record["rows"] = _count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
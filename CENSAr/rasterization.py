@@ -0,0 +1,262 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import mapclassify
+import matplotlib.pyplot as plt
+from matplotlib import colormaps, colors
+from matplotlib.cm import ScalarMappable
+from matplotlib.patches import Patch
+import shapely
+
+from CENSAr.logging import get_logger
+from CENSAr.simplification import layer_key
+
+try:
+    from rasterio import features
+    from rasterio.transform import from_bounds
+except ImportError:  # vectorized point in polygon fallback
+    features = None
+
+logger = get_logger(__name__)
+
+# polygon index grids by (layer, bounds, shape), shared by every column of a layer
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_SIZE = 16
+
+
+def _aspect(gdf: gpd.GeoDataFrame, bounds) -> float:
+    # same proportions as GeoDataFrame.plot in geographic crs
+    if gdf.crs is not None and gdf.crs.is_geographic:
+        return 1 / np.cos(np.deg2rad((bounds[1] + bounds[3]) / 2))
+    return 1.0
+
+
+def raster_shape(bounds, axsize: tuple[float, float], aspect: float = 1.0, dpi: float | None = None):
+    """
+    Pixel grid (rows, columns) covering `bounds` at the resolution of an axes
+    of `axsize` inches.
+    """
+    if dpi is None:
+        dpi = plt.rcParams["savefig.dpi"]
+        dpi = plt.rcParams["figure.dpi"] if dpi == "figure" else dpi
+    xmin, ymin, xmax, ymax = bounds
+    width, height = xmax - xmin, (ymax - ymin) * aspect
+    pixel = max(width / (axsize[0] * dpi), height / (axsize[1] * dpi))
+    return max(int(np.ceil(height / pixel)), 1), max(int(np.ceil(width / pixel)), 1)
+
+
+def _burn_points(geoms, bounds, shape, chunk_size=262_144):
+    # polygon containing every pixel center, queried by chunks of rows
+    xmin, ymin, xmax, ymax = bounds
+    rows, cols = shape
+    x = xmin + (np.arange(cols) + 0.5) * (xmax - xmin) / cols
+    y = ymax - (np.arange(rows) + 0.5) * (ymax - ymin) / rows
+    tree = shapely.STRtree(geoms)
+    index = np.full(rows * cols, -1, dtype=np.int32)
+    step = max(1, chunk_size // cols)
+    for start in range(0, rows, step):
+        xx, yy = np.meshgrid(x, y[start : start + step])
+        points = shapely.points(xx.ravel(), yy.ravel())
+        pixel, geom = tree.query(points, predicate="within")
+        index[start * cols + pixel] = geom
+    return index.reshape(shape)
+
+
+def burn_index(geoms: gpd.GeoSeries, bounds, shape, layer: str | None = None) -> np.ndarray:
+    """
+    Burns polygon positions into a pixel grid (pixel centers, -1 outside every
+    polygon). Grids are cached by layer, bounds and shape, so every column of
+    a layer is drawn from the same grid.
+
+    Parameters
+    ----------
+    geoms : gpd.GeoSeries
+        Polygons to be burned.
+    bounds : array-like
+        (xmin, ymin, xmax, ymax) of the grid.
+    shape : tuple[int, int]
+        Grid rows and columns.
+    layer : str, default None
+        Name identifying the layer geometries. A fingerprint by default.
+
+    Returns
+    -------
+    index:np.ndarray
+        (rows, columns) int32 grid of positions in `geoms`.
+    """
+    key = (layer or layer_key(geoms), tuple(np.round(bounds, 9)), tuple(shape))
+    if key in _INDEX_CACHE:
+        _INDEX_CACHE.move_to_end(key)
+        return _INDEX_CACHE[key]
+
+    if features is not None:
+        index = features.rasterize(
+            ((geom, i) for i, geom in enumerate(geoms.values) if geom is not None and not geom.is_empty),
+            out_shape=shape,
+            transform=from_bounds(*bounds, shape[1], shape[0]),
+            fill=-1,
+            dtype="int32",
+        )
+    else:
+        index = _burn_points(geoms.values, bounds, shape)
+
+    _INDEX_CACHE[key] = index
+    while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+        _INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def _feature_colors(values, cmap, scheme, k, classification_kwds, vmin, vmax, legend_kwds, alpha):
+    # rgba by feature and legend (handles or colorbar mappable), as GeoDataFrame.plot
+    values = pd.Series(values).reset_index(drop=True)
+    nan_idx = values.isna().to_numpy()
+    rgba = np.zeros((len(values), 4))
+    legend = {}
+
+    categorical = not pd.api.types.is_numeric_dtype(values) or isinstance(
+        values.dtype, pd.CategoricalDtype
+    )
+    binning = None
+    if scheme:
+        mask = ~nan_idx
+        if vmin is not None:
+            mask &= (values >= vmin).to_numpy()
+        if vmax is not None:
+            mask &= (values <= vmax).to_numpy()
+        binning = mapclassify.classify(values[mask], scheme, **{"k": k, **classification_kwds})
+        categorical = not legend_kwds.pop("colorbar", False)
+
+    if categorical:
+        if binning is not None:
+            labels = legend_kwds.pop("labels", None)
+            if labels is None:
+                labels = binning.get_legend_classes(fmt=legend_kwds.pop("fmt", "{:.2f}"))
+                if not legend_kwds.pop("interval", False):
+                    labels = [label[1:-1] for label in labels]
+            codes = np.full(len(values), -1)
+            codes[~nan_idx] = binning.find_bin(values[~nan_idx].to_numpy())
+            ngroups = len(binning.bins)
+            cmap = cmap or "viridis"
+        else:
+            categories = pd.Categorical(values)
+            codes = categories.codes
+            ngroups = len(categories.categories)
+            labels = legend_kwds.pop("labels", list(categories.categories))
+            cmap = cmap or ("tab20" if ngroups > 10 else "tab10")
+        cmap = colormaps[cmap] if isinstance(cmap, str) else cmap
+        palette = np.array(
+            [
+                cmap(i) if cmap.N < 32 else cmap(i / (ngroups - 1) if ngroups > 1 else 0.0)
+                for i in range(ngroups)
+            ]
+        )
+        rgba[codes >= 0] = palette[codes[codes >= 0]]
+        legend["handles"] = [
+            Patch(facecolor=color, alpha=alpha, label=label) for color, label in zip(palette, labels)
+        ]
+    else:
+        cmap = colormaps[cmap or "viridis"] if not isinstance(cmap, colors.Colormap) else cmap
+        valid = values[~nan_idx].to_numpy(dtype=float)
+        mn = valid.min() if vmin is None else vmin
+        mx = valid.max() if vmax is None else vmax
+        if binning is not None:
+            lowest = vmin if vmin is not None else getattr(binning, "lowest", None)
+            lowest = min(valid.min(), binning.bins[0]) if lowest is None else lowest
+            norm = colors.BoundaryNorm([lowest] + list(binning.bins), ncolors=256)
+            legend_kwds.setdefault("spacing", "proportional")
+        else:
+            norm = colors.Normalize(vmin=mn, vmax=mx)
+        rgba[~nan_idx] = cmap(norm(valid))
+        legend["mappable"] = ScalarMappable(norm=norm, cmap=cmap)
+
+    if alpha is not None:
+        rgba[:, 3] *= alpha
+    rgba[nan_idx] = 0
+    return rgba, legend
+
+
+def plot_raster(
+    gdf: gpd.GeoDataFrame,
+    column: str,
+    ax=None,
+    axsize: tuple[float, float] | None = None,
+    dpi: float | None = None,
+    cmap=None,
+    scheme: str | None = None,
+    k: int = 5,
+    classification_kwds: dict | None = None,
+    vmin: float | None = None,
+    vmax: float | None = None,
+    legend: bool = False,
+    legend_kwds: dict | None = None,
+    alpha: float | None = None,
+    layer: str | None = None,
+    **kwargs,
+):
+    """
+    Draws a polygon choropleth as an image: polygon values are burned into a
+    pixel grid at the axes resolution and shown with `imshow`, so the cost
+    scales with pixels instead of polygons. Colors, classification schemes
+    and legends follow `GeoDataFrame.plot`.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        Polygon layer (e.g. national tracts or an H3 grid).
+    column : str
+        Name of the column to be drawn.
+    ax : matplotlib.axes.Axes, default None
+        Axes to draw in. A new figure by default.
+    axsize : tuple[float, float], default None
+        Axes size in inches. Taken from the axes by default.
+    dpi : float, default None
+        Output resolution. The savefig (or figure) dpi by default.
+    cmap, scheme, k, classification_kwds, vmin, vmax, legend, legend_kwds, alpha
+        As in `GeoDataFrame.plot`.
+    layer : str, default None
+        Name identifying the layer geometries (the pixel grid cache key).
+    **kwargs
+        Vector styling arguments (e.g. edgecolor, linewidth), without effect
+        on an image.
+
+    Returns
+    -------
+    ax:matplotlib.axes.Axes
+        Axes with the image.
+    """
+    if ax is None:
+        _, ax = plt.subplots(figsize=axsize)
+    if axsize is None:
+        bbox = ax.get_position()
+        axsize = (bbox.width * ax.figure.get_figwidth(), bbox.height * ax.figure.get_figheight())
+    if kwargs:
+        logger.debug(f"ignoring vector styling arguments in raster mode: {list(kwargs)}")
+
+    bounds = gdf.total_bounds
+    aspect = _aspect(gdf, bounds)
+    shape = raster_shape(bounds, axsize, aspect, dpi)
+    index = burn_index(gdf.geometry, bounds, shape, layer)
+
+    legend_kwds = dict(legend_kwds or {})
+    rgba, handles = _feature_colors(
+        gdf[column], cmap, scheme, k, dict(classification_kwds or {}), vmin, vmax, legend_kwds, alpha
+    )
+    # -1 (no polygon) takes the transparent last row
+    rgba = np.vstack([rgba, np.zeros((1, 4))])
+    xmin, ymin, xmax, ymax = bounds
+    ax.imshow(
+        rgba[index],
+        extent=(xmin, xmax, ymin, ymax),
+        origin="upper",
+        interpolation="nearest",
+        aspect=aspect,
+    )
+
+    if legend:
+        if "handles" in handles:
+            ax.legend(handles=handles["handles"], **legend_kwds)
+        else:
+            ax.figure.colorbar(handles["mappable"], ax=ax, **legend_kwds)
+    return ax
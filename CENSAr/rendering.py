@@ -0,0 +1,249 @@
+import io
+import os
+import time
+import tempfile
+import importlib
+import multiprocessing
+from pathlib import Path
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import geopandas as gpd
+import pyarrow as pa
+from pydantic import BaseModel
+
+from CENSAr.logging import get_logger, ProgressLogger
+
+logger = get_logger(__name__)
+
+# worker state: shared memory blocks and layers decoded from them
+_SHARED = {}
+_LAYERS = {}
+
+
+class PlotSpec(BaseModel):
+    """
+    One figure of a batch: the plotting function, the shared layers passed to
+    it and where the result is written.
+
+    ...
+
+    Attributes
+    ----------
+    function : str
+        Name of a function in `CENSAr.plots` (e.g. "compare_chropleths") or
+        its full dotted path (e.g. "CENSAr.spatial_features.utils.plot_matplotlib_dual_choroplet").
+    output : str
+        Output file, relative to the batch output directory. Functions
+        returning many figures write `<stem>_<n><suffix>`, folium maps are
+        saved as html.
+    layers : list[str]
+        Shared layers passed as positional arguments.
+    layer_params : dict[str, str | list[str]]
+        Keyword arguments taking shared layers (e.g. {"urban_boundaries": ["footprint_2020"]}).
+    params : dict
+        Remaining keyword arguments.
+    savefig : dict
+        `Figure.savefig` arguments (e.g. {"dpi": 200, "bbox_inches": "tight"}).
+    """
+
+    function: str
+    output: str
+    layers: list[str] = []
+    layer_params: dict[str, str | list[str]] = {}
+    params: dict = {}
+    savefig: dict = {}
+
+
+class SharedLayers:
+    """
+    GeoDataFrames written once as GeoParquet into shared memory blocks, so
+    every worker of a batch reads them without pickling them by task.
+
+    ...
+
+    Attributes
+    ----------
+    handles : dict[str, tuple[str, int]]
+        Shared memory block name and size by layer, passed to the workers.
+
+    Methods
+    -------
+    close():
+        Releases and removes the shared memory blocks.
+    """
+
+    def __init__(self, layers: dict[str, gpd.GeoDataFrame]):
+        self._blocks = []
+        self.handles = {}
+        try:
+            for name, gdf in layers.items():
+                buffer = io.BytesIO()
+                gdf.to_parquet(buffer)
+                payload = buffer.getbuffer()
+                block = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+                block.buf[: len(payload)] = payload
+                self._blocks.append(block)
+                self.handles[name] = (block.name, len(payload))
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _init_worker(handles: dict):
+    # non interactive backend: workers only write files
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+    _SHARED.clear()
+    _LAYERS.clear()
+    for name, (block_name, size) in handles.items():
+        _SHARED[name] = (shared_memory.SharedMemory(name=block_name), size)
+
+
+def _layer(name: str) -> gpd.GeoDataFrame:
+    # decoded once by worker and reused by the following specs
+    if name not in _LAYERS:
+        block, size = _SHARED[name]
+        _LAYERS[name] = gpd.read_parquet(pa.BufferReader(block.buf[:size]))
+    return _LAYERS[name]
+
+
+def _plot_function(name: str):
+    if "." not in name:
+        name = f"CENSAr.plots.{name}"
+    module, function = name.rsplit(".", 1)
+    return getattr(importlib.import_module(module), function)
+
+
+def _save(result, path: Path, savefig: dict) -> list[str]:
+    import matplotlib.pyplot as plt
+    from matplotlib.axes import Axes
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(result, (list, tuple)):
+        paths = []
+        for n, item in enumerate(result):
+            paths += _save(item, path.with_name(f"{path.stem}_{n}{path.suffix}"), savefig)
+        return paths
+    if isinstance(result, Axes):
+        # e.g. `CENSAr.rasterization.plot_raster`
+        result = result.figure
+    if not hasattr(result, "savefig") and not hasattr(result, "save"):
+        raise ValueError(f"Can not write a `{type(result).__name__}` plot result")
+
+    # written next to the output and renamed: a crashed worker leaves no partial figure
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.stem}.", suffix=path.suffix, dir=path.parent)
+    os.close(fd)
+    try:
+        if hasattr(result, "savefig"):
+            result.savefig(tmp, **savefig)
+            plt.close(getattr(result, "figure", result))
+        else:
+            # folium maps
+            result.save(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return [str(path)]
+
+
+def _render(spec: PlotSpec, output_dir: str) -> dict:
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    record = {"function": spec.function, "output": spec.output}
+    try:
+        args = [_layer(name) for name in spec.layers]
+        kwargs = {
+            key: [_layer(name) for name in value] if isinstance(value, list) else _layer(value)
+            for key, value in spec.layer_params.items()
+        }
+        result = _plot_function(spec.function)(*args, **kwargs, **spec.params)
+        record["paths"] = _save(result, Path(output_dir) / spec.output, spec.savefig)
+        record["status"] = "done"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["wall_time"] = time.perf_counter() - start_wall
+    record["cpu_time"] = time.process_time() - start_cpu
+    return record
+
+
+def render_batch(
+    specs: list[PlotSpec | dict],
+    layers: dict[str, gpd.GeoDataFrame],
+    output_dir: str | Path,
+    max_workers: int | None = None,
+    progress_interval: float = 5.0,
+) -> pd.DataFrame:
+    """
+    Renders many figures in a process pool with the non interactive Agg
+    backend, writing every figure straight to `output_dir`.
+
+    Parameters
+    ----------
+    specs : list[PlotSpec | dict]
+        Figures to render (e.g. {'function': 'compare_chropleths',
+        'output': 'informal/2010.png', 'layers': ['tracts_2001', 'tracts_2010'],
+        'params': {'column': 'informal', 'simplify': True}}).
+    layers : dict[str, gpd.GeoDataFrame]
+        Layers shared by the specs, loaded once in the parent process and
+        shared with the workers through shared memory (GeoParquet).
+    output_dir : str | Path
+        Root directory of the figures.
+    max_workers : int, default None
+        Number of worker processes. All the available cores by default.
+    progress_interval : float, default 5.0
+        Minimum seconds between progress records.
+
+    Returns
+    -------
+    renders:pd.DataFrame
+        One row per spec with its status, written paths, wall and cpu time.
+    """
+    specs = [PlotSpec(**spec) if isinstance(spec, dict) else spec for spec in specs]
+    missing = {
+        name
+        for spec in specs
+        for value in [*spec.layers, *spec.layer_params.values()]
+        for name in (value if isinstance(value, list) else [value])
+    } - set(layers)
+    if missing:
+        raise ValueError(f"Unknown layers: {sorted(missing)}")
+
+    max_workers = max_workers or os.cpu_count()
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+    records, failed = [], 0
+    progress = ProgressLogger(logger, len(specs), "figures", interval=progress_interval)
+    with SharedLayers(layers) as shared:
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(shared.handles,),
+        )
+        with executor:
+            futures = [executor.submit(_render, spec, str(output_dir)) for spec in specs]
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                if record["status"] == "failed":
+                    failed += 1
+                    logger.error(f"{record['output']}: {record['error']}")
+                progress.update(failed=failed)
+    return pd.DataFrame(records)
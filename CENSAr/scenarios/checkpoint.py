@@ -0,0 +1,111 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+MANIFEST = "manifest.json"
+
+
+def _dump(obj, path: Path, name: str):
+    if obj is None:
+        return {"kind": "none"}
+    if isinstance(obj, dict):
+        return {
+            "kind": "dict",
+            "items": [
+                [str(key), isinstance(key, int), _dump(value, path, f"{name}.{key}")]
+                for key, value in obj.items()
+            ],
+        }
+    if isinstance(obj, gpd.GeoDataFrame):
+        obj.to_parquet(path / f"{name}.parquet")
+        return {"kind": "geodataframe", "file": f"{name}.parquet"}
+    if isinstance(obj, pd.DataFrame):
+        obj.to_parquet(path / f"{name}.parquet")
+        return {"kind": "dataframe", "file": f"{name}.parquet"}
+    if isinstance(obj, pd.Series):
+        obj.to_frame(name="values").to_parquet(path / f"{name}.parquet")
+        return {"kind": "series", "file": f"{name}.parquet", "name": obj.name}
+    if isinstance(obj, np.ndarray):
+        np.save(path / f"{name}.npy", obj, allow_pickle=False)
+        return {"kind": "array", "file": f"{name}.npy"}
+    return {"kind": "value", "value": obj}
+
+
+def _restore(entry: dict, path: Path):
+    kind = entry["kind"]
+    if kind == "none":
+        return None
+    if kind == "dict":
+        return {
+            int(key) if is_int else key: _restore(value, path)
+            for key, is_int, value in entry["items"]
+        }
+    if kind == "geodataframe":
+        return gpd.read_parquet(path / entry["file"])
+    if kind == "dataframe":
+        return pd.read_parquet(path / entry["file"])
+    if kind == "series":
+        return pd.read_parquet(path / entry["file"])["values"].rename(entry["name"])
+    if kind == "array":
+        return np.load(path / entry["file"], allow_pickle=False)
+    return entry["value"]
+
+
+def save_checkpoint(obj, path: str | Path) -> Path:
+    """
+    Persists a stage output (nested dicts of GeoDataFrames, DataFrames, Series,
+    arrays and json values) as columnar files plus a json manifest.
+
+    Parameters
+    ----------
+    obj : Any
+        Stage output.
+    path : str | Path
+        Checkpoint directory. It is written to a unique temporary sibling
+        first and renamed, so readers never see a partial checkpoint and
+        concurrent writers of the same stage do not clobber each other (the
+        first complete checkpoint wins).
+
+    Returns
+    -------
+    path:Path
+        Checkpoint directory.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent))
+    try:
+        manifest = _dump(obj, tmp, "output")
+        with open(tmp / MANIFEST, "w") as f:
+            json.dump(manifest, f)
+        try:
+            tmp.rename(path)
+        except OSError:
+            # written by a concurrent run with the same fingerprint
+            if has_checkpoint(path):
+                return path
+            # an incomplete directory left by an interrupted run
+            shutil.rmtree(path, ignore_errors=True)
+            tmp.rename(path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return path
+
+
+def has_checkpoint(path: str | Path) -> bool:
+    return (Path(path) / MANIFEST).exists()
+
+
+def load_checkpoint(path: str | Path):
+    """
+    Loads a stage output persisted with `save_checkpoint`.
+    """
+    path = Path(path)
+    with open(path / MANIFEST, "r") as f:
+        manifest = json.load(f)
+    return _restore(manifest, path)
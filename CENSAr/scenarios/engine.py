@@ -0,0 +1,615 @@
+import os
+import json
+import hashlib
+from glob import glob
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import srsly
+from pydantic import BaseModel
+
+from CENSAr.aggregation import named_aggregation
+from CENSAr.datasources import (
+    informal_settlements,
+    personas_radios_prov,
+    persproy_depto_2025,
+    radios_precenso_2020,
+    radios_prov,
+    tipoviv_radios_prov,
+)
+from CENSAr.logging import get_logger
+from CENSAr.profiling import span
+from CENSAr.scenarios.checkpoint import has_checkpoint, load_checkpoint, save_checkpoint
+from CENSAr.spatial_distributions.geo_utils import build_thiner_pct_in_coarser_geom
+from CENSAr.spatial_distributions.modeling_tools import (
+    constrained_allocation,
+    observed_dist,
+    simulate_cat_var,
+    simulate_joint_cat_var,
+    sweep_cat_var,
+    simulate_total_var,
+    take_positions,
+    tract_positions,
+    tracts_2010_to_2001,
+)
+
+logger = get_logger(__name__)
+
+PARENT_DIR = Path(__file__).parent
+# stage outputs are persisted on disk only when a directory is configured
+CHECKPOINT_DIR = os.getenv("CENSAR_CHECKPOINT_DIR")
+
+
+class TotalsSpec(BaseModel):
+    method: str = "projection"
+    namedept: str | None = None
+    base_year: str = "2010"
+    projected_population: int | None = None
+    precenso_filter: dict[str, str] | None = None
+    floor: str = "redistribute"
+
+
+class CalibrationSpec(BaseModel):
+    enabled: bool = True
+    version: str = "072022"
+    crs: int = 5347
+    coarser_tot: bool = False
+    mix_dist: bool = True
+
+
+class AllocationSpec(BaseModel):
+    aggregation: str = "tipo vivienda particular"
+    catname: str = "informal"
+    pct_val: float
+    base_year: str = "0110"
+    # joint allocation of several categories (e.g. every column of the aggregation)
+    categories: list[str] | None = None
+    seed: int = 1
+
+
+class ReconcileSpec(BaseModel):
+    allocation_method: str = "avoid_relocations"
+    floor: str = "redistribute"
+    complement: str | None = "formal"
+
+
+class ScenarioSpec(BaseModel):
+    city: str
+    prov: str
+    forecast_year: str = "2020"
+    link_columns: dict[int, str] = {2001: "link", 2010: "link"}
+    footprints: dict[int, str | None] = {2001: None, 2010: None, 2020: None}
+    totals: TotalsSpec
+    calibration: CalibrationSpec = CalibrationSpec()
+    allocation: AllocationSpec
+    reconcile: ReconcileSpec = ReconcileSpec()
+
+
+def load_scenarios(path: str | Path) -> dict[str, ScenarioSpec]:
+    """
+    Load scenario specs from a yaml file.
+    """
+    with open(path, "r") as f:
+        specs = srsly.yaml_loads(f.read())
+
+    return {key: ScenarioSpec(**value) for key, value in specs.items()}  # type: ignore
+
+
+SCENARIOS = {}
+for path in glob(str(PARENT_DIR / "*.yaml")):
+    SCENARIOS.update(load_scenarios(path))
+
+
+def _apply_bounds(sim, lower=None, upper=None, floor="redistribute"):
+    """
+    Keeps simulated values from falling under the previous census value
+    (`lower`) and exceeding `upper`.
+
+    "redistribute" reconciles both bounds keeping the simulated grand total
+    (see `constrained_allocation`). "previous" and "reflect" are the legacy
+    rules: lost units are restored (or mirrored over the previous value) and
+    values over `upper` are clipped, so the grand total is not preserved.
+    """
+    sim = np.asarray(sim, dtype=float).copy()
+    valid = ~np.isnan(sim)
+    if lower is None:
+        lower = np.zeros_like(sim)
+    if upper is not None:
+        # previous values over the upper bound cannot be kept
+        lower = np.where(lower > upper, upper, lower)
+
+    if floor == "redistribute":
+        sim[valid] = constrained_allocation(
+            sim[valid],
+            lower=lower[valid],
+            upper=None if upper is None else upper[valid],
+            integer=True,
+        )
+        return sim
+
+    diff = sim - lower
+    neg = diff < 0
+    if floor == "previous":
+        sim[neg] = lower[neg]
+    elif floor == "reflect":
+        sim[neg] = lower[neg] - diff[neg]
+    else:
+        raise ValueError(f"Invalid floor rule: {floor}")
+    if upper is not None:
+        sim = np.where(sim > upper, upper, sim)
+    return sim
+
+
+def _load(spec):
+    missing = [year for year, path in spec.footprints.items() if path is None]
+    if missing:
+        raise ValueError(f"Urban footprint paths missing for years: {missing}")
+    return {year: gpd.read_file(path) for year, path in spec.footprints.items()}
+
+
+def _clip(spec, footprints):
+    # 2020 geometries are not available: 2010 tracts within the 2020 footprint
+    return {
+        2001: radios_prov(year=2001, prov=spec.prov, mask=footprints[2001]),
+        2010: radios_prov(year=2010, prov=spec.prov, mask=footprints[2010]),
+        2020: radios_prov(year=2010, prov=spec.prov, mask=footprints[2020]),
+    }
+
+
+def _link(spec, tracts):
+    tipo = {}
+    for year in (2001, 2010):
+        table = tipoviv_radios_prov(
+            year=year,
+            prov=spec.prov,
+            var_types={spec.link_columns[year]: "object"},
+        )
+        tipo[year] = tracts[year].set_index("link").join(table.set_index("link"))
+
+    # Simulation canvas
+    canvas = tracts[2020].set_index("link")
+    canvas["link_2010"] = canvas.index
+    canvas = tracts_2010_to_2001(tracts_2020_gdf=canvas, prov_name=spec.prov)
+
+    # 2020 canvas -> 2010 tracts crosswalk (integer positions)
+    pos_2010 = tract_positions(canvas["link_2010"], tipo[2010].index)
+    return {"tipo": tipo, "canvas": canvas, "pos_2010": pos_2010}
+
+
+def _precenso_weights(spec, canvas, total_2010):
+    # Uses "total_dwelling_units" for census locations over 2000 inhabitans
+    precenso = radios_precenso_2020(geo_filter=spec.totals.precenso_filter, mask=None)
+    precenso["geometry"] = precenso["geometry"].centroid
+    total_2020 = canvas.sjoin(
+        precenso[["link", "total_viviendas", "geometry"]], predicate="contains"
+    )
+    total_2020 = total_2020.drop_duplicates(subset="link_2010", keep="last")
+    pos_2020 = tract_positions(canvas["link_2010"], total_2020["link_2010"])
+
+    # Census areas under this population limit uses 2010 dwelling units values
+    canvas = canvas[["link_2010"]].copy()
+    canvas["total_2020"] = take_positions(total_2020["total_viviendas"], pos_2020)
+    canvas["total_2020"] = canvas["total_2020"].fillna(pd.Series(total_2010, index=canvas.index))
+    return observed_dist(
+        catname="total_2020",
+        idx_col=None,
+        base_year=None,
+        gdf_base=canvas,
+        gdf_forecast=None,
+    )
+
+
+def _project_totals(spec, tracts, link):
+    totals, canvas, tipo = spec.totals, link["canvas"], link["tipo"]
+    total_2010 = take_positions(tipo[2010]["total"], link["pos_2010"])
+
+    if totals.method == "projection":
+        # Estimates total dwelling units based on persons tables (2001 & 2010)
+        pers = {}
+        for year in (2001, 2010):
+            table = personas_radios_prov(
+                year=year, prov=spec.prov, var_types={"link": "object"}
+            )
+            pers[year] = tracts[year].set_index("link").join(table.set_index("link"))
+
+        total = simulate_total_var(
+            estimate_totals={
+                "proy_df": persproy_depto_2025(prov=spec.prov),
+                "namedept": totals.namedept,
+            },
+            base_year=totals.base_year,
+            forecast_year=spec.forecast_year,
+            catname="total",
+            gdf_pers_01=pers[2001],
+            gdf_var_01=tipo[2001],
+            gdf_pers_10=pers[2010],
+            gdf_var_10=tipo[2010],
+        )
+
+    elif totals.method == "user_defined":
+        if totals.precenso_filter:
+            weights = _precenso_weights(spec, canvas, total_2010)
+        else:
+            weights = pd.Series(total_2010, index=canvas.index).fillna(0)
+            weights = weights / weights.sum()
+
+        # distributed over the simulation canvas tracts
+        total = simulate_total_var(
+            estimate_totals={
+                "user_defined": totals.projected_population,
+                "weights": weights.to_numpy(),
+            },
+            base_year=totals.base_year,
+            forecast_year=spec.forecast_year,
+            catname="total",
+            gdf_var_10=canvas,
+        )
+
+    else:
+        raise ValueError(f"Invalid totals method: {totals.method}")
+
+    # status quo: avoid dwelling units relocation
+    total = total.reindex(canvas.index).to_numpy()
+    total = _apply_bounds(total, lower=total_2010, floor=totals.floor)
+    logger.info(f"Adjusted_total: {np.nansum(total)}")
+    return pd.Series(total, index=canvas.index, name="total")
+
+
+def _calibrate(spec, link):
+    if not spec.calibration.enabled:
+        return None
+
+    # Calibration vector (informal settlements surface)
+    return build_thiner_pct_in_coarser_geom(
+        coarser_geom=link["canvas"].reset_index(),
+        thiner_geom=informal_settlements(version=spec.calibration.version),
+        coarser_idx="link",
+        thiner_idx="id_renabap",
+        crs=spec.calibration.crs,
+        coarser_tot=spec.calibration.coarser_tot,
+    )
+
+
+def _aggregate(spec, link):
+    return {
+        year: named_aggregation(link["tipo"][year], name=spec.allocation.aggregation)
+        for year in (2001, 2010)
+    }
+
+
+def _forecast_canvas(link, totals):
+    canvas = link["canvas"][["link_2001", "link_2010", "geometry"]].copy()
+    canvas.insert(0, "total", totals.reindex(canvas.index).to_numpy())
+    return canvas
+
+
+def _allocate(spec, link, totals, aggregated, calibration):
+    allocation = spec.allocation
+    canvas = _forecast_canvas(link, totals)
+
+    if allocation.categories:
+        # every category drawn at once within the tract totals
+        return simulate_joint_cat_var(
+            gdf_var_01=aggregated[2001],
+            gdf_var_10=aggregated[2010],
+            base_year=allocation.base_year,
+            forecast_gdf=canvas.reset_index(),
+            categories=allocation.categories,
+            tot_colname="total",
+            pct_vals={allocation.catname: allocation.pct_val},
+            seed=allocation.seed,
+        )
+
+    return simulate_cat_var(
+        gdf_var_01=aggregated[2001],
+        gdf_var_10=aggregated[2010],
+        base_year=allocation.base_year,
+        forecast_year=spec.forecast_year,
+        forecast_gdf=canvas.reset_index(),
+        pct_val=allocation.pct_val,
+        catname={"2001": allocation.catname, "2010": allocation.catname},
+        tot_colname="total",
+        calibration_vector={
+            "weights": calibration,
+            "mix_dist": spec.calibration.mix_dist,
+        },
+    )
+
+
+def _reconcile(spec, link, totals, aggregated, simulated):
+    catname, reconcile = spec.allocation.catname, spec.reconcile
+    canvas = _forecast_canvas(link, totals)
+
+    if isinstance(simulated, pd.DataFrame):
+        # joint allocation already adds up to the tract totals
+        if reconcile.allocation_method == "avoid_relocations":
+            logger.warning("Relocation floors are not applied to joint category allocations")
+        return canvas.join(simulated)
+
+    sim = simulated.reindex(canvas.index).to_numpy()
+
+    previous = None
+    if reconcile.allocation_method == "avoid_relocations":
+        # It avoids looses by census tract
+        previous = take_positions(aggregated[2010][catname], link["pos_2010"])
+
+    # Use upper limits to avoid exceding total when reproducing observed distributions
+    canvas[catname] = _apply_bounds(
+        sim, lower=previous, upper=canvas["total"].to_numpy(), floor=reconcile.floor
+    )
+
+    if reconcile.complement:
+        canvas[reconcile.complement] = canvas["total"] - canvas[catname]
+    return canvas
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable[..., Any]
+    params: list[str]
+    inputs: list[str]
+    files: list[str] = []
+
+
+# Stages in topological order: every stage only depends on previous ones
+STAGES = [
+    Stage("load", _load, ["footprints"], [], files=["footprints"]),
+    Stage("clip", _clip, ["prov"], ["load"]),
+    Stage("link", _link, ["prov", "link_columns"], ["clip"]),
+    Stage("project_totals", _project_totals, ["prov", "forecast_year", "totals"], ["clip", "link"]),
+    Stage("calibrate", _calibrate, ["calibration"], ["link"]),
+    Stage("aggregate", _aggregate, ["allocation.aggregation"], ["link"]),
+    Stage(
+        "allocate",
+        _allocate,
+        ["forecast_year", "allocation", "calibration.mix_dist"],
+        ["link", "project_totals", "aggregate", "calibrate"],
+    ),
+    Stage(
+        "reconcile",
+        _reconcile,
+        ["allocation.catname", "reconcile"],
+        ["link", "project_totals", "aggregate", "allocate"],
+    ),
+]
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def _get(spec: dict, key: str):
+    for part in key.split("."):
+        spec = spec[int(part) if part.isdigit() else part]
+    return spec
+
+
+def _set(spec: dict, key: str, value):
+    *parents, last = key.split(".")
+    for part in parents:
+        spec = spec[int(part) if part.isdigit() else part]
+    spec[int(last) if last.isdigit() else last] = value
+
+
+def _file_signature(value):
+    if isinstance(value, dict):
+        return {str(k): _file_signature(v) for k, v in value.items()}
+    if isinstance(value, str) and os.path.exists(value):
+        stat = os.stat(value)
+        return [stat.st_size, stat.st_mtime_ns]
+    return None
+
+
+def _code_signature() -> str:
+    # package sources, so checkpoints of a previous version are not restored
+    digest = hashlib.sha256()
+    for path in sorted(PARENT_DIR.parent.rglob("*.py")):
+        digest.update(str(path.relative_to(PARENT_DIR.parent)).encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+CODE_SIGNATURE = _code_signature()
+
+
+def fingerprint(stage: Stage, spec: dict, upstream: list[str]) -> str:
+    """
+    Hash of the parameters a stage reads, the size and modification time of
+    the files it reads, the package sources and the fingerprints of its inputs.
+    """
+    payload = {
+        "stage": stage.name,
+        "code": CODE_SIGNATURE,
+        "params": {key: _get(spec, key) for key in stage.params},
+        "files": {key: _file_signature(_get(spec, key)) for key in stage.files},
+        "upstream": upstream,
+    }
+    content = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ScenarioEngine:
+    """
+    Runs a declarative urban growth scenario as a pipeline of cached stages.
+
+    ...
+
+    Attributes
+    ----------
+    spec : ScenarioSpec
+        Scenario definition (see the yaml catalogs in this package).
+    checkpoint_dir : str | Path | None
+        Directory where stage outputs are persisted (GeoParquet, parquet and
+        npy files) by fingerprint, so they are reused across sessions.
+        None (default, unless `CENSAR_CHECKPOINT_DIR` is set) keeps them
+        only in memory.
+
+    Methods
+    -------
+    run(overrides):
+        Runs the scenario, reusing every stage whose parameters and inputs
+        did not change since the previous run.
+    sweep(pct_vals, base_years, mix_dist, n_realizations, overrides):
+        Simulates the scenario category over a parameter grid in one batch.
+    """
+
+    def __init__(self, spec: ScenarioSpec, checkpoint_dir: str | Path | None = CHECKPOINT_DIR):
+        self.spec = spec
+        self.checkpoint_dir = checkpoint_dir
+        self._cache: dict[str, tuple[str, Any]] = {}
+
+    def resolve(self, overrides: dict | None = None) -> ScenarioSpec:
+        """
+        Applies dotted-key overrides (e.g. {'allocation.pct_val': 3.0}) to the spec.
+        """
+        spec = self.spec.dict()
+        for key, value in (overrides or {}).items():
+            _set(spec, key, value)
+        return ScenarioSpec(**spec)
+
+    def _stage(self, name, spec, keys):
+        """
+        Output of a stage: from memory, from its disk checkpoint or computed
+        (resolving only the inputs it actually needs).
+        """
+        stage, key = STAGES_BY_NAME[name], keys[name]
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            logger.info(f"{spec.city}: reusing stage `{name}`")
+            return cached[1]
+
+        path = None
+        if self.checkpoint_dir is not None:
+            path = Path(self.checkpoint_dir) / name / key
+
+        if path is not None and has_checkpoint(path):
+            logger.info(f"{spec.city}: restoring stage `{name}` checkpoint")
+            with span(f"scenario.{name}.restore", city=spec.city):
+                result = load_checkpoint(path)
+        else:
+            args = [self._stage(input_name, spec, keys) for input_name in stage.inputs]
+            logger.info(f"{spec.city}: running stage `{name}`")
+            with span(f"scenario.{name}", city=spec.city) as record:
+                result = stage.func(spec, *args)
+                if isinstance(result, (pd.Series, pd.DataFrame)):
+                    record["rows"] = len(result)
+            if path is not None:
+                with span(f"scenario.{name}.checkpoint", city=spec.city):
+                    save_checkpoint(result, path)
+
+        self._cache[name] = (key, result)
+        return result
+
+    @staticmethod
+    def _fingerprints(spec: ScenarioSpec) -> dict[str, str]:
+        spec_dict, keys = spec.dict(), {}
+        for stage in STAGES:
+            keys[stage.name] = fingerprint(
+                stage, spec_dict, [keys[name] for name in stage.inputs]
+            )
+        return keys
+
+    def run(self, overrides: dict | None = None) -> dict:
+        """
+        Runs the scenario.
+
+        Parameters
+        ----------
+        overrides : dict, default None
+            Dotted-key parameters replacing the spec values for this run
+            (e.g. {'footprints.2020': path, 'allocation.pct_val': 3.0}).
+
+        Returns
+        -------
+        scenario:dict
+            Aggregated indicators with 2020 simulated distributions,
+            2010 and 2001 observed distributions, urban footprint vector data
+            and scenario metadata.
+        """
+        spec = self.resolve(overrides)
+        keys = self._fingerprints(spec)
+        results = {
+            name: self._stage(name, spec, keys) for name in ("load", "aggregate", "reconcile")
+        }
+
+        footprints = results["load"]
+        return {
+            2001: results["aggregate"][2001].copy(),
+            2010: results["aggregate"][2010].copy(),
+            2020: results["reconcile"].copy(),
+            "footpr01": footprints[2001].copy(),
+            "footpr10": footprints[2010].copy(),
+            "footpr20": footprints[2020].copy(),
+            "agg": True,
+            "calibration": spec.calibration.enabled,
+            "pct_val": spec.allocation.pct_val,
+        }
+
+
+    def sweep(
+        self,
+        pct_vals: list[float],
+        base_years: list[str] = ("2001", "2010", "0110"),
+        mix_dist: list[bool] = (True, False),
+        n_realizations: int | None = None,
+        overrides: dict | None = None,
+    ) -> pd.DataFrame:
+        """
+        Simulates the scenario category over a parameter grid, reusing the
+        cached totals, aggregations and calibration stages (see `sweep_cat_var`).
+        Allocations are returned before reconciliation.
+
+        Parameters
+        ----------
+        pct_vals : list[float]
+            Percentages of the category over the total units.
+        base_years : list[str], default ("2001", "2010", "0110")
+            Observed distributions used to allocate the category.
+        mix_dist : list[bool], default (True, False)
+            Whether observed distributions are mixed with the calibration vector.
+        n_realizations : int, default None
+            Number of realizations drawn for every grid point.
+        overrides : dict, default None
+            Dotted-key parameters replacing the spec values (see `run`).
+
+        Returns
+        -------
+        sweep:pd.DataFrame
+            Units by grid point (rows) and tract (columns).
+        """
+        spec = self.resolve(overrides)
+        keys = self._fingerprints(spec)
+        link, totals, aggregated, calibration = (
+            self._stage(name, spec, keys)
+            for name in ("link", "project_totals", "aggregate", "calibrate")
+        )
+        catname = spec.allocation.catname
+        return sweep_cat_var(
+            gdf_var_01=aggregated[2001],
+            gdf_var_10=aggregated[2010],
+            forecast_gdf=_forecast_canvas(link, totals).reset_index(),
+            catname={"2001": catname, "2010": catname},
+            tot_colname="total",
+            pct_vals=pct_vals,
+            base_years=base_years,
+            mix_dist=mix_dist,
+            calibration_weights=calibration,
+            seed=spec.allocation.seed,
+            n_realizations=n_realizations,
+        )
+
+_ENGINES: dict[str, ScenarioEngine] = {}
+
+
+def scenario_engine(name: str, checkpoint_dir: str | Path | None = CHECKPOINT_DIR) -> ScenarioEngine:
+    """
+    Returns the (session wide) engine of a named scenario, so consecutive
+    runs share their cached stages.
+    """
+    if name not in _ENGINES or _ENGINES[name].checkpoint_dir != checkpoint_dir:
+        spec = SCENARIOS.get(name)
+        if not spec:
+            logger.error(f"Scenario `{name}` not found in {SCENARIOS.keys()}")
+            raise ValueError(f"Scenario `{name}` not found in {SCENARIOS.keys()}")
+        _ENGINES[name] = ScenarioEngine(spec, checkpoint_dir=checkpoint_dir)
+    return _ENGINES[name]
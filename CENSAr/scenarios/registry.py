@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+
+class GeometryRegistry:
+    """
+    Shared store of tract geometries keyed by tract link. Scenario frames keep
+    an integer `geom_id` column instead of their own geometries, so holding
+    several census years (or ensemble members) of the same tracts does not
+    multiply geometry memory.
+
+    ...
+
+    A link registered again with an identical geometry gets its existing id.
+    The same link with a different geometry (e.g. a tract clipped by another
+    urban footprint, or another census vintage) gets a new one.
+
+    Attributes
+    ----------
+    crs : pyproj.CRS | None
+        Coordinate reference system of the registered geometries.
+
+    Methods
+    -------
+    register(geoms, keys):
+        Adds geometries and returns their ids.
+    geometry(ids):
+        Geometries of the given ids.
+    compact(gdf, key):
+        Replaces the frame geometries by their ids.
+    attach(frame):
+        Rebuilds a GeoDataFrame from a compacted frame.
+    to_wkb():
+        Table of ids and WKB encoded geometries.
+    """
+
+    def __init__(self, crs=None):
+        self.crs = crs
+        self._keys = np.empty(0, dtype=object)
+        self._geoms = np.empty(0, dtype=object)
+
+    def __len__(self):
+        return len(self._geoms)
+
+    def register(self, geoms, keys=None) -> np.ndarray:
+        """
+        Adds geometries to the registry.
+
+        Parameters
+        ----------
+        geoms : gpd.GeoSeries
+            Geometries to register. They are reprojected to the registry crs
+            (the first registered crs when it was not set).
+        keys : array-like, default None
+            Tract links of the geometries. The GeoSeries index by default.
+
+        Returns
+        -------
+        ids:np.ndarray
+            Integer id of every geometry.
+        """
+        if self.crs is None:
+            self.crs = geoms.crs
+        elif geoms.crs is not None and geoms.crs != self.crs:
+            geoms = geoms.to_crs(self.crs)
+
+        values = np.asarray(geoms.values, dtype=object)
+        keys = np.asarray(geoms.index if keys is None else keys, dtype=object)
+        ids = np.full(len(values), -1, dtype=np.int64)
+
+        # candidate (incoming, registered) pairs sharing the link
+        registered = pd.DataFrame({"key": self._keys, "geom_id": np.arange(len(self))})
+        incoming = pd.DataFrame({"key": keys, "pos": np.arange(len(values))})
+        pairs = incoming.merge(registered, on="key")
+        if len(pairs):
+            same = shapely.equals_exact(
+                values[pairs["pos"].to_numpy()],
+                self._geoms[pairs["geom_id"].to_numpy()],
+                tolerance=0,
+            )
+            matched = pairs[same].drop_duplicates("pos")
+            ids[matched["pos"].to_numpy()] = matched["geom_id"].to_numpy()
+
+        # new geometries (also repeated ones within the batch) get new ids
+        new = np.flatnonzero(ids < 0)
+        if len(new):
+            wkb = pd.Series(shapely.to_wkb(values[new]))
+            codes, _ = pd.factorize(pd.Series(list(zip(keys[new], wkb))))
+            uniques = new[pd.Series(np.arange(len(new))).groupby(codes).first().to_numpy()]
+            ids[new] = len(self) + codes
+            self._keys = np.concatenate([self._keys, keys[uniques]])
+            self._geoms = np.concatenate([self._geoms, values[uniques]])
+        return ids
+
+    def geometry(self, ids) -> gpd.GeoSeries:
+        """
+        Returns the geometries of the given ids (sharing the registered objects).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        return gpd.GeoSeries(self._geoms[ids], crs=self.crs)
+
+    def compact(self, gdf: gpd.GeoDataFrame, key: str | None = None) -> pd.DataFrame:
+        """
+        Registers the frame geometries and returns its attributes with a
+        `geom_id` column.
+
+        Parameters
+        ----------
+        gdf : gpd.GeoDataFrame
+            Frame to be compacted.
+        key : str, default None
+            Column with the tract links. The frame index by default.
+
+        Returns
+        -------
+        frame:pd.DataFrame
+            Frame attributes with the geometry ids.
+        """
+        keys = gdf.index if key is None else gdf[key]
+        frame = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+        frame["geom_id"] = self.register(gdf.geometry, keys=keys)
+        return frame
+
+    def attach(self, frame: pd.DataFrame, name: str = "geometry") -> gpd.GeoDataFrame:
+        """
+        Rebuilds a GeoDataFrame from a frame compacted with `compact`.
+        """
+        geoms = self.geometry(frame["geom_id"].to_numpy())
+        geoms.index = frame.index
+        return gpd.GeoDataFrame(frame.drop(columns="geom_id"), geometry=geoms.rename(name))
+
+    def to_wkb(self) -> pd.DataFrame:
+        """
+        Returns the registered geometries as a table of ids and WKB encodings.
+        """
+        return pd.DataFrame(
+            {
+                "geom_id": np.arange(len(self)),
+                "key": self._keys.astype(str),
+                "wkb": shapely.to_wkb(self._geoms),
+            }
+        )
+
+
+def compact_scenario(scenario: dict, registry: GeometryRegistry | None = None):
+    """
+    Replaces the GeoDataFrames of a scenario dict by frames referencing a
+    shared geometry registry.
+
+    Parameters
+    ----------
+    scenario : dict
+        Output of a scenario function (e.g. `corrientes_stquo_2020`).
+    registry : GeometryRegistry, default None
+        Registry to be extended (e.g. shared by many runs of a city). Frames
+        in another crs (e.g. footprints) are reprojected to the registry crs.
+
+    Returns
+    -------
+    compacted:tuple[dict, GeometryRegistry]
+        Scenario with compacted frames and the registry holding their geometries.
+    """
+    if registry is None:
+        registry = GeometryRegistry()
+    compacted = {
+        key: registry.compact(value) if isinstance(value, gpd.GeoDataFrame) else value
+        for key, value in scenario.items()
+    }
+    return compacted, registry
+
+
+def expand_scenario(compacted: dict, registry: GeometryRegistry) -> dict:
+    """
+    Rebuilds the GeoDataFrames of a scenario compacted with `compact_scenario`.
+    """
+    return {
+        key: registry.attach(value)
+        if isinstance(value, pd.DataFrame) and "geom_id" in value.columns
+        else value
+        for key, value in compacted.items()
+    }
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import time
+import hashlib
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from pydantic import BaseModel
+
+from CENSAr import urban_scenarios
+from CENSAr.datasources import CARTO_DIR, preload_layers
+from CENSAr.logging import get_logger, ProgressLogger
+from CENSAr.profiling import TRACER
+from CENSAr.scenarios.engine import scenario_engine
+from CENSAr.scenarios.store import ScenarioStore
+
+logger = get_logger(__name__)
+
+
+def _slug(value) -> str:
+    # plain scalars are kept readable, anything else (dicts, lists, paths)
+    # becomes a short hash safe as a partition directory name
+    text = str(value)
+    if isinstance(value, (str, int, float, bool)) and re.fullmatch(r"[\w.+-]+", text):
+        return text
+    content = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:10]
+
+
+class ScenarioJob(BaseModel):
+    city: str
+    scenario: str
+    params: dict = {}
+    run: str | None = None
+
+    @property
+    def run_name(self) -> str:
+        if self.run:
+            return self.run
+        items = sorted(
+            (k, v)
+            for k, v in self.params.items()
+            if not k.startswith(("path", "footprints"))
+        )
+        return ",".join(f"{_slug(k)}={_slug(v)}" for k, v in items) or "default"
+
+
+def _run_job(job: ScenarioJob, output_dir: str) -> dict:
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    record = {"city": job.city, "scenario": job.scenario, "run": job.run_name}
+    # forked workers inherit the parent records: only return the new ones
+    n_traced = len(TRACER.records)
+    try:
+        if hasattr(urban_scenarios, job.scenario):
+            scenario = getattr(urban_scenarios, job.scenario)(**job.params)
+        else:
+            # declarative spec: params are dotted-key overrides
+            scenario = scenario_engine(job.scenario).run(job.params)
+        path = ScenarioStore(output_dir).write(scenario, job.city, job.scenario, job.run_name)
+        record["path"] = str(path)
+        record["status"] = "done"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["wall_time"] = time.perf_counter() - start_wall
+    record["cpu_time"] = time.process_time() - start_cpu
+    if TRACER.enabled:
+        record["trace"] = TRACER.records[n_traced:]
+    return record
+
+
+def run_scenarios(
+    jobs: list[ScenarioJob | dict],
+    output_dir: str | Path,
+    max_workers: int | None = None,
+    preload: list[tuple[int, str]] | None = None,
+    root: str = CARTO_DIR,
+    progress_interval: float = 5.0,
+) -> pd.DataFrame:
+    """
+    Runs many scenario jobs (cities x parameters) in a process pool and
+    writes each result to a partitioned `ScenarioStore`
+    (`city=<city>/scenario=<scenario>/run=<run>`).
+
+    Parameters
+    ----------
+    jobs : list[ScenarioJob | dict]
+        Jobs to run. `scenario` is the name of a function in
+        `CENSAr.urban_scenarios` and `params` its keyword arguments
+        (e.g. {'city': 'corrientes', 'scenario': 'corrientes_stquo_2020',
+        'params': {'path00': ..., 'pct_val': 3.65}}), or the name of a
+        scenario spec and `params` its dotted-key overrides
+        (e.g. {'footprints.2020': ..., 'allocation.pct_val': 3.65}).
+    output_dir : str | Path
+        Root directory of the output store.
+    max_workers : int, default None
+        Number of worker processes. All the available cores by default.
+    preload : list[tuple[int, str]], default None
+        (year, prov) provincial tract layers loaded once in the parent process.
+        With the fork start method workers inherit them read-only instead of
+        reading them again for every job.
+    root : str
+        Cartography directory for the preloaded layers.
+    progress_interval : float, default 5.0
+        Minimum seconds between progress records. Every job is logged at
+        debug level and failed jobs as errors.
+
+    Returns
+    -------
+    timings:pd.DataFrame
+        One row per job with its status, output path, wall and cpu time.
+    """
+    jobs = [ScenarioJob(**job) if isinstance(job, dict) else job for job in jobs]
+    max_workers = max_workers or os.cpu_count()
+
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods:
+        if preload:
+            preload_layers(preload, root=root)
+        ctx = multiprocessing.get_context("fork")
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx)
+    else:
+        # workers do not share memory with the parent: load once per worker
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=preload_layers if preload else None,
+            initargs=(preload, root) if preload else (),
+        )
+
+    records, failed = [], 0
+    start = time.perf_counter()
+    progress = ProgressLogger(logger, len(jobs), "scenario jobs", interval=progress_interval)
+    with executor:
+        futures = [executor.submit(_run_job, job, str(output_dir)) for job in jobs]
+        for n, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            TRACER.extend(record.pop("trace", []))
+            records.append(record)
+            msg = (
+                f"[{n}/{len(jobs)}] {record['city']} {record['scenario']} "
+                f"({record['run']}) {record['status']} in {record['wall_time']:.1f}s"
+            )
+            if record["status"] == "failed":
+                failed += 1
+                logger.error(f"{msg}: {record['error']}")
+            else:
+                logger.debug(msg)
+            progress.update(failed=failed)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"{len(jobs)} scenario jobs finished in {elapsed:.1f}s")
+    return pd.DataFrame(records)
@@ -0,0 +1,265 @@
+import json
+import shutil
+import tempfile
+from glob import glob
+from pathlib import Path
+
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from CENSAr.logging import get_logger
+from CENSAr.scenarios.registry import GeometryRegistry
+
+logger = get_logger(__name__)
+
+GEOMETRIES = "geometries.parquet"
+METADATA = "metadata.json"
+
+
+def partition_path(root: str | Path, city: str, scenario: str, run: str) -> Path:
+    """
+    Directory of a scenario run in the partitioned output store.
+    """
+    return Path(root) / f"city={city}" / f"scenario={scenario}" / f"run={run}"
+
+
+def _replace_dir(tmp: Path, path: Path):
+    # the previous partition is moved aside first, so the swap is two renames
+    try:
+        tmp.rename(path)
+        return
+    except OSError:
+        pass
+    old = Path(tempfile.mkdtemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent))
+    try:
+        try:
+            path.rename(old / path.name)
+        except FileNotFoundError:
+            # removed by a concurrent writer of the same run
+            pass
+        try:
+            tmp.rename(path)
+        except OSError:
+            # a concurrent writer of the same run published first
+            if not (path / METADATA).exists():
+                raise
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _frame_key(name: str):
+    return int(name) if name.isdigit() else name
+
+
+class ScenarioStore:
+    """
+    Partitioned store of scenario results (`city=<city>/scenario=<scenario>/run=<run>`).
+
+    ...
+
+    Every GeoDataFrame of a scenario is written as a parquet file with its
+    attributes and an integer `geom_id` column. Geometries are written once by
+    run in `geometries.parquet` (WKB), deduplicated across years through a
+    `GeometryRegistry`: the 2020 canvas repeats most of the 2010 tract
+    geometries.
+
+    Attributes
+    ----------
+    root : Path
+        Root directory of the store.
+
+    Methods
+    -------
+    write(scenario, city, scenario_name, run):
+        Writes a scenario dict.
+    runs(city, scenario_name):
+        Lists the stored runs.
+    read(city, scenario_name, run, key, columns, geometry):
+        Loads one frame, optionally a subset of columns and without geometries.
+    scan(key, columns, city, scenario_name, geometry):
+        Loads the same frame columns from many runs at once.
+    metadata(city, scenario_name, run):
+        Loads the scenario metadata.
+    load(city, scenario_name, run):
+        Loads a whole scenario dict back.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def write(self, scenario: dict, city: str, scenario_name: str, run: str) -> Path:
+        """
+        Writes a scenario dict: every GeoDataFrame as attributes plus geometry
+        ids, the shared geometries and the remaining entries as json metadata.
+
+        Parameters
+        ----------
+        scenario : dict
+            Output of a scenario function (e.g. `corrientes_stquo_2020`).
+        city : str
+            City partition.
+        scenario_name : str
+            Scenario partition.
+        run : str
+            Run partition (e.g. a parameters label).
+
+        Returns
+        -------
+        path:Path
+            Partition directory.
+        """
+        path = partition_path(self.root, city, scenario_name, run)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # unique staging directory: jobs writing the same run do not clobber
+        # each other (the last one to finish wins)
+        tmp = Path(tempfile.mkdtemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent))
+        try:
+            rows, n_geometries = self._write_frames(scenario, tmp)
+            _replace_dir(tmp, path)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        logger.info(
+            f"stored {city}/{scenario_name}/{run}: "
+            f"{rows} geometries written as {n_geometries}"
+        )
+        return path
+
+    @staticmethod
+    def _write_frames(scenario: dict, tmp: Path) -> tuple[int, int]:
+        frames = {k: v for k, v in scenario.items() if isinstance(v, gpd.GeoDataFrame)}
+        metadata = {
+            str(k): v for k, v in scenario.items() if not isinstance(v, gpd.GeoDataFrame)
+        }
+
+        # geometries deduplicated across frames by tract link, one registry by
+        # crs (footprints keep their own crs) with consecutive id ranges
+        registries, compacted = {}, {}
+        for key, frame in frames.items():
+            crs = frame.crs.to_wkt() if frame.crs else None
+            registry = registries.setdefault(crs, GeometryRegistry(frame.crs))
+            compacted[key] = (crs, registry.compact(frame, "link" if "link" in frame else None))
+        offsets, tables, start = {}, [GeometryRegistry().to_wkb()], 0
+        for crs, registry in registries.items():
+            offsets[crs] = start
+            table = registry.to_wkb()
+            table["geom_id"] += start
+            tables.append(table)
+            start += len(registry)
+        geometries = pd.concat(tables, ignore_index=True)
+        geometries.to_parquet(tmp / GEOMETRIES, index=False)
+
+        layers = {}
+        for key, frame in frames.items():
+            crs, attrs = compacted[key]
+            attrs["geom_id"] += offsets[crs]
+            attrs.to_parquet(tmp / f"{key}.parquet")
+            layers[str(key)] = {
+                "crs": frame.crs.to_wkt() if frame.crs else None,
+                "geometry": frame.geometry.name,
+                "rows": len(frame),
+            }
+        metadata["_layers"] = layers
+
+        with open(tmp / METADATA, "w") as f:
+            json.dump(metadata, f, default=str)
+
+        return sum(len(frame) for frame in frames.values()), len(geometries)
+
+    def runs(self, city: str | None = None, scenario_name: str | None = None) -> pd.DataFrame:
+        """
+        Lists the stored runs (city, scenario, run and path).
+        """
+        pattern = partition_path(self.root, city or "*", scenario_name or "*", "*")
+        records = []
+        for path in sorted(glob(str(pattern))):
+            path = Path(path)
+            if path.name.endswith(".tmp"):
+                continue
+            parts = [p.split("=", 1)[1] for p in path.parts[-3:]]
+            records.append(dict(zip(["city", "scenario", "run"], parts), path=str(path)))
+        return pd.DataFrame(records, columns=["city", "scenario", "run", "path"])
+
+    def metadata(self, city: str, scenario_name: str, run: str) -> dict:
+        path = partition_path(self.root, city, scenario_name, run)
+        with open(path / METADATA, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _geometries(path: Path, geom_ids, crs, name="geometry"):
+        table = pd.read_parquet(path / GEOMETRIES, filters=[("geom_id", "in", list(set(geom_ids)))])
+        geoms = pd.Series(shapely.from_wkb(table["wkb"].to_numpy()), index=table["geom_id"])
+        return gpd.GeoSeries(geoms.reindex(geom_ids).to_numpy(), crs=crs, name=name)
+
+    def read(
+        self,
+        city: str,
+        scenario_name: str,
+        run: str,
+        key: int | str = 2020,
+        columns: list[str] | None = None,
+        geometry: bool = True,
+    ) -> pd.DataFrame | gpd.GeoDataFrame:
+        """
+        Loads a scenario frame.
+
+        Parameters
+        ----------
+        city, scenario_name, run : str
+            Partition of the run.
+        key : int | str, default 2020
+            Frame of the scenario dict (e.g. 2001, 2010, 2020, 'footpr20').
+        columns : list[str], default None
+            Attribute columns to be loaded. All by default.
+        geometry : bool, default True
+            Whether to attach the frame geometries (only the ones referenced
+            by the loaded rows are decoded).
+
+        Returns
+        -------
+        frame:pd.DataFrame | gpd.GeoDataFrame
+            Stored frame with the requested columns.
+        """
+        path = partition_path(self.root, city, scenario_name, run)
+        read_columns = None if columns is None else list(columns) + ["geom_id"]
+        frame = pd.read_parquet(path / f"{key}.parquet", columns=read_columns)
+        if not geometry:
+            return frame.drop(columns="geom_id")
+
+        layer = self.metadata(city, scenario_name, run)["_layers"][str(key)]
+        geoms = self._geometries(path, frame["geom_id"].to_numpy(), layer["crs"], layer["geometry"])
+        geoms.index = frame.index
+        return gpd.GeoDataFrame(frame.drop(columns="geom_id"), geometry=geoms)
+
+    def scan(
+        self,
+        key: int | str = 2020,
+        columns: list[str] | None = None,
+        city: str | None = None,
+        scenario_name: str | None = None,
+        geometry: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Loads the same frame columns from every matching run, labeled with
+        their `city`, `scenario` and `run` partitions.
+        """
+        frames = []
+        for record in self.runs(city, scenario_name).itertuples():
+            frame = self.read(
+                record.city, record.scenario, record.run, key, columns, geometry
+            )
+            frames.append(frame.assign(city=record.city, scenario=record.scenario, run=record.run))
+        if not frames:
+            return pd.DataFrame(columns=(columns or []) + ["city", "scenario", "run"])
+        return pd.concat(frames)
+
+    def load(self, city: str, scenario_name: str, run: str) -> dict:
+        """
+        Loads a whole scenario dict back (frames with geometries and metadata).
+        """
+        metadata = self.metadata(city, scenario_name, run)
+        layers = metadata.pop("_layers")
+        scenario = {_frame_key(k): v for k, v in metadata.items()}
+        for key in layers:
+            scenario[_frame_key(key)] = self.read(city, scenario_name, run, key)
+        return scenario
@@ -0,0 +1,235 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import geopandas as gpd
+import matplotlib.pyplot as plt
+import shapely
+from shapely.errors import GEOSException
+
+from CENSAr.logging import get_logger
+
+logger = get_logger(__name__)
+
+# degrees (EPSG:4326) by pixel at zoom 0 of a web map
+WEB_PIXEL_DEGREES = 360 / 256
+
+
+def layer_key(geoms: gpd.GeoSeries) -> str:
+    """
+    Cheap fingerprint of a layer geometries (bounds and vertex counts of every
+    geometry and crs), used to recognize the same tracts across frames with
+    different attribute columns.
+    """
+    values = geoms.values
+    digest = hashlib.sha1(np.ascontiguousarray(shapely.bounds(values)).tobytes())
+    digest.update(shapely.get_num_coordinates(values).tobytes())
+    digest.update(str(geoms.crs).encode())
+    return digest.hexdigest()
+
+
+def tolerance_for_figure(bounds, figsize: tuple[float, float], dpi: float | None = None) -> float:
+    """
+    Simplification level for a map drawn in a figure: the power of two closest
+    below the size of one pixel in data units, so maps of similar scale share
+    the same cached level.
+
+    Parameters
+    ----------
+    bounds : array-like
+        (xmin, ymin, xmax, ymax) of the drawn layer in the plotting crs.
+    figsize : tuple[float, float]
+        Size of the axes in inches.
+    dpi : float, default None
+        Resolution of the output. The savefig (or figure) dpi by default.
+    """
+    if dpi is None:
+        dpi = plt.rcParams["savefig.dpi"]
+        dpi = plt.rcParams["figure.dpi"] if dpi == "figure" else dpi
+    xmin, ymin, xmax, ymax = bounds
+    pixel = max((xmax - xmin) / (figsize[0] * dpi), (ymax - ymin) / (figsize[1] * dpi))
+    if not np.isfinite(pixel) or pixel <= 0:
+        return 0.0
+    return float(2.0 ** np.floor(np.log2(pixel)))
+
+
+def tolerance_for_zoom(zoom: int) -> float:
+    """
+    Simplification level (degrees, EPSG:4326) for a web map zoom level: the
+    size of one pixel at that zoom.
+    """
+    return WEB_PIXEL_DEGREES / 2**zoom
+
+
+def _simplify(geoms: gpd.GeoSeries, tolerance: float) -> gpd.GeoSeries:
+    if tolerance <= 0:
+        return geoms
+    values = geoms.values
+    polygonal = shapely.get_type_id(values) if len(values) else np.array([3])
+    if hasattr(shapely, "coverage_simplify") and np.isin(polygonal, (3, 6)).all():
+        try:
+            # shared tract edges are simplified once, no gaps nor overlaps
+            simplified = shapely.coverage_simplify(values, tolerance)
+            return gpd.GeoSeries(simplified, index=geoms.index, crs=geoms.crs, name=geoms.name)
+        except GEOSException as e:
+            logger.debug(f"coverage simplification failed ({e}), simplifying by geometry")
+    return geoms.simplify(tolerance, preserve_topology=True)
+
+
+class SimplificationCache:
+    """
+    Reprojected and simplified layer geometries reused by the plotting
+    functions, keyed by layer, crs and tolerance.
+
+    ...
+
+    Only geometries are cached: a frame of the same tracts with other columns
+    (another indicator or year) gets the cached geometries with its own
+    attributes. Levels are powers of two of the crs units (see
+    `tolerance_for_figure` and `tolerance_for_zoom`), so maps of similar
+    scale share them.
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of cached (layer, crs, tolerance) levels.
+
+    Methods
+    -------
+    get(gdf, crs, tolerance, layer):
+        Returns the frame reprojected and simplified.
+    clear():
+        Drops every cached level.
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._levels = OrderedDict()
+
+    def __len__(self):
+        return len(self._levels)
+
+    def clear(self):
+        self._levels.clear()
+
+    def _lookup(self, key):
+        geoms = self._levels.get(key)
+        if geoms is not None:
+            self._levels.move_to_end(key)
+        return geoms
+
+    def _store(self, key, geoms):
+        self._levels[key] = geoms
+        while len(self._levels) > self.maxsize:
+            self._levels.popitem(last=False)
+
+    def geometries(
+        self,
+        geoms: gpd.GeoSeries,
+        crs=None,
+        tolerance: float = 0.0,
+        layer: str | None = None,
+    ) -> gpd.GeoSeries:
+        """
+        Returns the geometries reprojected to `crs` and simplified with
+        `tolerance` (crs units).
+        """
+        layer = layer or layer_key(geoms)
+        crs = geoms.crs if crs is None else gpd.GeoSeries(crs=crs).crs
+        key = (layer, crs.to_string() if crs is not None else None, tolerance)
+
+        cached = self._lookup(key)
+        if cached is not None and len(cached) == len(geoms):
+            return cached
+
+        # the reprojected full resolution layer is also a cached level
+        projected = self._lookup(key[:2] + (0.0,))
+        if projected is None or len(projected) != len(geoms):
+            projected = geoms if crs is None or geoms.crs == crs else geoms.to_crs(crs)
+            self._store(key[:2] + (0.0,), projected)
+        if tolerance <= 0:
+            return projected
+
+        simplified = _simplify(projected, tolerance)
+        logger.debug(
+            f"simplified {len(geoms)} geometries at {tolerance:g}: "
+            f"{shapely.get_num_coordinates(projected.values).sum()} -> "
+            f"{shapely.get_num_coordinates(simplified.values).sum()} vertices"
+        )
+        self._store(key, simplified)
+        return simplified
+
+    def get(
+        self,
+        gdf: gpd.GeoDataFrame,
+        crs=None,
+        tolerance: float = 0.0,
+        layer: str | None = None,
+    ) -> gpd.GeoDataFrame:
+        """
+        Returns the frame reprojected and simplified with cached geometries.
+
+        Parameters
+        ----------
+        gdf : gpd.GeoDataFrame
+            Layer to be drawn.
+        crs : int | str, default None
+            Plotting crs. The frame crs by default.
+        tolerance : float, default 0.0
+            Simplification tolerance in `crs` units. 0 only reprojects.
+        layer : str, default None
+            Name identifying the layer geometries (e.g. "tracts_2010_18").
+            A fingerprint of the geometries by default.
+
+        Returns
+        -------
+        gdf:gpd.GeoDataFrame
+            Frame attributes with the cached geometries.
+        """
+        geoms = self.geometries(gdf.geometry, crs, tolerance, layer)
+        out = gdf.copy(deep=False)
+        out[gdf.geometry.name] = gpd.GeoSeries(geoms.values, index=gdf.index)
+        return out.set_crs(geoms.crs, allow_override=True)
+
+
+SIMPLIFICATION_CACHE = SimplificationCache()
+
+
+def plotting_layer(
+    gdf: gpd.GeoDataFrame,
+    crs=None,
+    simplify: bool | float = True,
+    figsize: tuple[float, float] | None = None,
+    zoom: int | None = None,
+    layer: str | None = None,
+) -> gpd.GeoDataFrame:
+    """
+    Returns a layer ready to be drawn from the session simplification cache.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        Layer to be drawn.
+    crs : int | str, default None
+        Plotting crs. The frame crs by default.
+    simplify : bool | float, default True
+        True picks the level from `figsize` (one pixel) or `zoom`, a number is
+        used as tolerance (crs units) and False keeps full resolution.
+    figsize : tuple[float, float], default None
+        Size in inches of the axes the layer is drawn in.
+    zoom : int, default None
+        Web map zoom level (the layer is drawn in EPSG:4326).
+    layer : str, default None
+        Name identifying the layer geometries.
+    """
+    if simplify is True:
+        if zoom is not None:
+            tolerance = tolerance_for_zoom(zoom)
+        elif figsize is not None:
+            bounds = SIMPLIFICATION_CACHE.geometries(gdf.geometry, crs, 0.0, layer).total_bounds
+            tolerance = tolerance_for_figure(bounds, figsize)
+        else:
+            tolerance = 0.0
+    else:
+        tolerance = float(simplify or 0.0)
+    return SIMPLIFICATION_CACHE.get(gdf, crs, tolerance, layer)
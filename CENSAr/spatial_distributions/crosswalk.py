@@ -0,0 +1,331 @@
+import os
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from CENSAr.datasources import CARTO_DIR, DATA_DIR, radios_prov, tracts_matching_0110
+from CENSAr.logging import get_logger
+from CENSAr.spatial_distributions.geo_utils import intersection_area_matrix
+
+logger = get_logger(__name__)
+
+CACHE_DIR = os.getenv(
+    "CENSAR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "censar"),
+)
+
+
+class Crosswalk:
+    """
+    Sparse linkage between the tracts of two census vintages.
+
+    ...
+
+    Attributes
+    ----------
+    weights : scipy.sparse.csr_matrix
+        (target x source) matrix with the overlay between tracts (intersection
+        area, or 1 for tabular pairings).
+    source_ids : np.ndarray
+        Source vintage tracts identifiers (matrix columns).
+    target_ids : np.ndarray
+        Target vintage tracts identifiers (matrix rows).
+    links : np.ndarray | None
+        Position of the main source tract of every target tract (-1 if none),
+        when it is not the largest overlay (e.g. tabular pairings).
+
+    Methods
+    -------
+    to_target(values, intensive):
+        Moves source tract values to the target tracts.
+    to_source(values, intensive):
+        Moves target tract values to the source tracts.
+    target_link():
+        Main source tract of every target tract.
+    source_link():
+        Main target tract of every source tract.
+    save(path):
+        Persists the crosswalk as a compressed npz file.
+    load(path):
+        Loads a persisted crosswalk.
+    """
+
+    def __init__(self, weights, source_ids, target_ids, links=None):
+        self.weights = sparse.csr_matrix(weights, dtype=float)
+        self.source_ids = np.asarray(source_ids)
+        self.target_ids = np.asarray(target_ids)
+        self.links = None if links is None else np.asarray(links, dtype=np.int64)
+
+    @staticmethod
+    def _normalize(matrix, axis):
+        totals = np.asarray(matrix.sum(axis=axis)).ravel()
+        with np.errstate(divide="ignore"):
+            scale = np.where(totals > 0, 1 / totals, 0)
+        if axis == 0:
+            return matrix @ sparse.diags(scale)
+        return sparse.diags(scale) @ matrix
+
+    def to_target(self, values, intensive=False):
+        """
+        Moves source tract values (one or many columns) to the target tracts.
+
+        Parameters
+        ----------
+        values : array-like | pd.Series | pd.DataFrame
+            Values aligned with `source_ids`, with shape (source,) or (source, k).
+        intensive : bool, default False
+            If False, values are counts split by the share of every source tract
+            falling in each target (totals are preserved). If True, values are
+            rates averaged with the overlay weights of every target.
+
+        Returns
+        -------
+        moved:np.ndarray | pd.Series | pd.DataFrame
+            Values aligned with `target_ids` (labeled if the input was labeled).
+        """
+        matrix = self._normalize(self.weights, 1 if intensive else 0)
+        return self._apply(matrix, values, self.target_ids)
+
+    def to_source(self, values, intensive=False):
+        """
+        Moves target tract values to the source tracts (see `to_target`).
+        """
+        matrix = self._normalize(self.weights.T.tocsr(), 1 if intensive else 0)
+        return self._apply(matrix, values, self.source_ids)
+
+    @staticmethod
+    def _apply(matrix, values, ids):
+        moved = matrix @ np.nan_to_num(np.asarray(values, dtype=float))
+        if isinstance(values, pd.DataFrame):
+            return pd.DataFrame(moved, index=ids, columns=values.columns)
+        if isinstance(values, pd.Series):
+            return pd.Series(moved, index=ids, name=values.name)
+        return moved
+
+    @staticmethod
+    def _row_argmax(matrix):
+        # largest weight by row, ties resolved to the last column (as the
+        # dict based linkages this replaces kept the last match)
+        matrix = matrix.tocoo()
+        order = np.lexsort((-matrix.col, -matrix.data, matrix.row))
+        rows, first = np.unique(matrix.row[order], return_index=True)
+        best = np.full(matrix.shape[0], -1)
+        best[rows] = matrix.col[order][first]
+        return best
+
+    def target_link(self):
+        """
+        Returns the source tract with the largest overlay for every target tract
+        (e.g. the `link_2010` column of 2020 tracts). Ties go to the last
+        source column. Tabular pairings (every pair weights 1) link every
+        target to the source of its last row in the table instead.
+        """
+        best = self._row_argmax(self.weights) if self.links is None else self.links
+        links = np.where(best >= 0, self.source_ids[best], None)
+        return pd.Series(links, index=self.target_ids)
+
+    def source_link(self):
+        """
+        Returns the target tract with the largest overlay for every source tract.
+        """
+        best = self._row_argmax(self.weights.T)
+        links = np.where(best >= 0, self.target_ids[best], None)
+        return pd.Series(links, index=self.source_ids)
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                data=self.weights.data,
+                indices=self.weights.indices,
+                indptr=self.weights.indptr,
+                shape=self.weights.shape,
+                source_ids=self.source_ids.astype(str),
+                target_ids=self.target_ids.astype(str),
+                **({} if self.links is None else {"links": self.links}),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            weights = sparse.csr_matrix(
+                (f["data"], f["indices"], f["indptr"]), shape=tuple(f["shape"])
+            )
+            links = f["links"] if "links" in f.files else None
+            return cls(weights, f["source_ids"], f["target_ids"], links)
+
+
+def crosswalk_from_geometries(
+    source_gdf,
+    target_gdf,
+    source_idx="link",
+    target_idx="link",
+    crs=5347,
+    method="area",
+):
+    """
+    Builds the crosswalk between two tract layers.
+
+    Parameters
+    ----------
+    source_gdf : gpd.GeoDataFrame
+        Source vintage tract geometries (e.g. 2010).
+    target_gdf : gpd.GeoDataFrame
+        Target vintage tract geometries (e.g. 2020).
+    source_idx : str, default "link"
+        Name of the source tracts index column.
+    target_idx : str, default "link"
+        Name of the target tracts index column.
+    crs : int | str, default 5347
+        Projected coordinate reference system used to estimate areas.
+    method : str, default "area"
+        "area" weights every pair by its intersection area. "centroid" links
+        every target tract to the source tract containing its centroid (or the
+        nearest one), as `tracts_2020_to_2010` does.
+
+    Returns
+    -------
+    crosswalk:Crosswalk
+        Sparse (target x source) linkage.
+    """
+    source = source_gdf[[source_idx, "geometry"]].to_crs(crs).reset_index(drop=True)
+    target = target_gdf[[target_idx, "geometry"]].to_crs(crs).reset_index(drop=True)
+    shape = (len(target), len(source))
+
+    if method == "centroid":
+        centroids = target.geometry.centroid
+        target_pos, source_pos = source.sindex.query(centroids, predicate="within")
+        target_pos, first = np.unique(target_pos, return_index=True)
+        source_pos = source_pos[first]
+
+        missing = np.setdiff1d(np.arange(len(target)), target_pos)
+        if len(missing):
+            near_target, near_source = source.sindex.nearest(
+                centroids.iloc[missing], return_all=False
+            )
+            target_pos = np.concatenate([target_pos, missing[near_target]])
+            source_pos = np.concatenate([source_pos, near_source])
+
+        values = target.geometry.area.to_numpy()[target_pos]
+        weights = sparse.coo_matrix((values, (target_pos, source_pos)), shape=shape)
+
+    elif method == "area":
+        weights = intersection_area_matrix(target, source)
+
+    else:
+        raise ValueError(f"Invalid crosswalk method: {method}")
+
+    return Crosswalk(weights, source[source_idx], target[target_idx])
+
+
+def crosswalk_from_pairs(pairs, source_col, target_col):
+    """
+    Builds the crosswalk from a table of tract pairs (e.g. `tracts_matching_0110`).
+
+    Parameters
+    ----------
+    pairs : pd.DataFrame
+        Table with one row by linked (source, target) pair.
+    source_col : str
+        Name of the source tracts column (e.g. "Link01").
+    target_col : str
+        Name of the target tracts column (e.g. "Link10").
+
+    Returns
+    -------
+    crosswalk:Crosswalk
+        Sparse (target x source) linkage where every pair weights 1. Every
+        target links to the source of its last row (as mapping the table
+        with a dict).
+    """
+    pairs = pairs[[source_col, target_col]].dropna()
+    last = pairs.drop_duplicates(target_col, keep="last")
+    pairs = pairs.drop_duplicates()
+    source_pos, source_ids = pd.factorize(pairs[source_col])
+    target_pos, target_ids = pd.factorize(pairs[target_col])
+    links = pd.Index(source_ids).get_indexer(
+        pd.Series(last[source_col].to_numpy(), index=last[target_col].to_numpy())
+        .reindex(target_ids)
+        .to_numpy()
+    )
+    weights = sparse.coo_matrix(
+        (np.ones(len(pairs)), (target_pos, source_pos)),
+        shape=(len(target_ids), len(source_ids)),
+    )
+    return Crosswalk(weights.tocsr(), source_ids, target_ids, links)
+
+
+def province_crosswalk(
+    prov,
+    source_year,
+    target_year,
+    cache_dir=CACHE_DIR,
+    carto_root=CARTO_DIR,
+    data_root=DATA_DIR,
+    crs=5347,
+):
+    """
+    Loads the persisted crosswalk between two census vintages of a province,
+    building and saving it the first time it is requested.
+
+    2001 <-> 2010 linkages come from the tracts pairing tables, any other pair of
+    years from the intersection areas of the provincial tract layers.
+
+    Parameters
+    ----------
+    prov : str
+        Province name (e.g. "chaco").
+    source_year : int
+        Source census year.
+    target_year : int
+        Target census year.
+    cache_dir : str, default CACHE_DIR
+        Directory where crosswalks are persisted.
+    carto_root : str, default CARTO_DIR
+        Cartography directory.
+    data_root : str, default DATA_DIR
+        Census tables directory.
+    crs : int | str, default 5347
+        Projected coordinate reference system used to estimate areas.
+
+    Returns
+    -------
+    crosswalk:Crosswalk
+        Sparse (target x source) linkage.
+    """
+    source_year, target_year = int(source_year), int(target_year)
+    # different cartographies (or area crs) are cached apart
+    roots = [
+        root if "://" in str(root) else os.path.abspath(root)
+        for root in (carto_root, data_root)
+    ]
+    inputs = "|".join([*roots, str(crs), "links"])
+    key = hashlib.sha1(inputs.encode("utf-8")).hexdigest()[:12]
+    path = Path(cache_dir) / "crosswalks" / f"{prov}_{source_year}_{target_year}_{key}.npz"
+    if path.exists():
+        return Crosswalk.load(path)
+
+    logger.info(f"building {prov} {source_year}->{target_year} crosswalk")
+    if {source_year, target_year} == {2001, 2010}:
+        pairs = tracts_matching_0110(
+            prov=prov,
+            var_types={"Link01": object, "Link10": object},
+            root=data_root,
+        )
+        cols = {2001: "Link01", 2010: "Link10"}
+        crosswalk = crosswalk_from_pairs(pairs, cols[source_year], cols[target_year])
+    else:
+        crosswalk = crosswalk_from_geometries(
+            source_gdf=radios_prov(year=source_year, prov=prov, root=carto_root),
+            target_gdf=radios_prov(year=target_year, prov=prov, root=carto_root),
+            crs=crs,
+        )
+
+    crosswalk.save(path)
+    return crosswalk
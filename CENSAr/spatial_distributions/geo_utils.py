@@ -1,5 +1,8 @@
+import numpy as np
+import pandas as pd
+import shapely
 import geopandas as gpd
-from shapely import wkt
+from scipy import sparse
 
 def from_wkt(df, wkt_column, crs=4326):
     """
@@ -17,13 +20,171 @@ def from_wkt(df, wkt_column, crs=4326):
     Returns
     -------
     gdf:gpd.GeoDataFrame
-        Table with shapely geometry representation.
+        Table with shapely geometry representation (the input is not modified).
     """
-    df["geometry"]= df[wkt_column].apply(wkt.loads) 
-    gdf = gpd.GeoDataFrame(df, geometry='geometry',crs=crs) 
-    
+    geometry = shapely.from_wkt(df[wkt_column].to_numpy())
+    data = df.drop(columns="geometry", errors="ignore")
+    gdf = gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
+
     return gdf
 
+def from_wkb(df, wkb_column, crs=4326):
+    """
+    Loads a shapely geometry from a well known binary column (bytes or hex).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe with wkb geometry representation.
+    wkb_column : str
+        Name of the wkb column.
+    crs : str | int, default 4326
+        Coordinate reference system.
+
+    Returns
+    -------
+    gdf:gpd.GeoDataFrame
+        Table with shapely geometry representation (the input is not modified).
+    """
+    geometry = shapely.from_wkb(df[wkb_column].to_numpy())
+    data = df.drop(columns="geometry", errors="ignore")
+    gdf = gpd.GeoDataFrame(data, geometry=geometry, crs=crs)
+
+    return gdf
+
+def read_geo_csv(path, geom_column="geometry", geom_format="wkt", crs=4326,
+                 chunksize=None, **kwargs):
+    """
+    Reads a csv file with a wkt or wkb geometry column.
+
+    Parameters
+    ----------
+    path : str
+        Path or url of the csv file.
+    geom_column : str, default "geometry"
+        Name of the geometry column.
+    geom_format : str, default "wkt"
+        Geometry encoding, "wkt" or "wkb" (hex).
+    crs : str | int, default 4326
+        Coordinate reference system.
+    chunksize : int, default None
+        If given, the file is read and parsed by chunks of rows so only one
+        chunk of raw geometry strings is held in memory at once.
+    **kwargs: Aditional pd.read_csv arguments (e.g. usecols)
+
+    Returns
+    -------
+    gdf:gpd.GeoDataFrame
+        Table with shapely geometry representation.
+    """
+    parsers = {"wkt": from_wkt, "wkb": from_wkb}
+    if geom_format not in parsers:
+        raise ValueError(f"Invalid geometry format: {geom_format}")
+    parser = parsers[geom_format]
+
+    if chunksize is None:
+        return parser(pd.read_csv(path, **kwargs), geom_column, crs=crs)
+
+    chunks = [
+        parser(chunk, geom_column, crs=crs)
+        for chunk in pd.read_csv(path, chunksize=chunksize, **kwargs)
+    ]
+    return pd.concat(chunks, ignore_index=True)
+
+def _valid(geoms):
+    # repairs self-intersecting polygons (as gpd.overlay does) before overlaying
+    invalid = ~shapely.is_valid(geoms) & ~shapely.is_missing(geoms)
+    if invalid.any():
+        geoms = geoms.copy()
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+    return geoms
+
+
+def intersection_area_matrix(source_geom, target_geom):
+    """
+    Returns the pairwise intersection areas between two polygon layers.
+
+    Candidate pairs come from one bulk STRtree query and the intersections are
+    computed (vectorized) for those pairs only. Invalid geometries of both
+    layers (e.g. self-intersecting rings) are repaired with `make_valid`.
+
+    Parameters
+    ----------
+    source_geom : gpd.GeoDataFrame | gpd.GeoSeries
+        Source Polygon geometries, in a projected coordinate reference system.
+    target_geom : gpd.GeoDataFrame | gpd.GeoSeries
+        Target Polygon geometries, in the same coordinate reference system.
+
+    Returns
+    -------
+    areas:scipy.sparse.csr_matrix
+        (source x target) matrix with the intersection area of every pair.
+    """
+    source = _valid(np.asarray(source_geom.geometry.array))
+    target = _valid(np.asarray(target_geom.geometry.array))
+
+    tree = shapely.STRtree(target)
+    source_pos, target_pos = tree.query(source, predicate="intersects")
+    ovl_area = shapely.area(
+        shapely.intersection(source[source_pos], target[target_pos])
+    )
+
+    keep = ovl_area > 0
+    areas = sparse.coo_matrix(
+        (ovl_area[keep], (source_pos[keep], target_pos[keep])),
+        shape=(len(source), len(target)),
+    )
+    return areas.tocsr()
+
+
+def interpolate_extensive(areas, values, source_area):
+    """
+    Moves counts from source to target polygons proportionally to the share
+    of every source polygon falling in each target.
+
+    Parameters
+    ----------
+    areas : scipy.sparse.csr_matrix
+        (source x target) intersection areas (see `intersection_area_matrix`).
+    values : array-like
+        Counts by source polygon, with shape (source,) or (source, k).
+    source_area : array-like
+        Area of every source polygon.
+
+    Returns
+    -------
+    target_values:np.ndarray
+        Counts by target polygon.
+    """
+    shares = sparse.diags(1 / np.asarray(source_area, dtype=float)) @ areas
+    return shares.T @ np.nan_to_num(np.asarray(values, dtype=float))
+
+
+def interpolate_intensive(areas, values):
+    """
+    Averages rates from source polygons weighted by their overlay area with
+    every target polygon.
+
+    Parameters
+    ----------
+    areas : scipy.sparse.csr_matrix
+        (source x target) intersection areas (see `intersection_area_matrix`).
+    values : array-like
+        Rates by source polygon, with shape (source,) or (source, k).
+
+    Returns
+    -------
+    target_values:np.ndarray
+        Area weighted rates by target polygon (NaN where nothing overlaps).
+    """
+    covered = np.asarray(areas.sum(axis=0)).ravel()
+    weighted = areas.T @ np.nan_to_num(np.asarray(values, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if weighted.ndim == 2:
+            return weighted / covered[:, None]
+        return weighted / covered
+
+
 def from_coarser_to_thiner_area(coarser_geom, thiner_geom,coarser_idx, thiner_idx):
     """
     Returns the overlay area between coarser and thiner geometries.
@@ -44,14 +205,17 @@ def from_coarser_to_thiner_area(coarser_geom, thiner_geom,coarser_idx, thiner_id
     proportions:pd.DataFrame
         Table indicating the area overlay for thiner and coarser geometries and their respective shares.
     """
+    areas = intersection_area_matrix(coarser_geom, thiner_geom).tocoo()
+    thiner_area = thiner_geom.geometry.area.to_numpy()
+    coarser_area = coarser_geom.geometry.area.to_numpy()
 
-    thiner_geom['thiner_area'] = thiner_geom.geometry.area
-    coarser_geom['coarser_area'] = coarser_geom.geometry.area
-
-    ovl = gpd.overlay(coarser_geom, thiner_geom, how = "intersection", keep_geom_type=False)
-    ovl['ovl_area'] = ovl.geometry.area
-
-    proportions = ovl[[thiner_idx, coarser_idx,'thiner_area', 'coarser_area', 'ovl_area']].copy()
+    proportions = pd.DataFrame({
+        thiner_idx: thiner_geom[thiner_idx].to_numpy()[areas.col],
+        coarser_idx: coarser_geom[coarser_idx].to_numpy()[areas.row],
+        'thiner_area': thiner_area[areas.col],
+        'coarser_area': coarser_area[areas.row],
+        'ovl_area': areas.data,
+    })
     proportions['thiner_share'] = proportions['ovl_area']/proportions['thiner_area']*100
     proportions['thiner_share'] = proportions['thiner_share'].round(1)
     proportions['coarser_share'] = proportions['ovl_area']/proportions['coarser_area']*100
@@ -82,31 +246,33 @@ def build_thiner_pct_in_coarser_geom(coarser_geom, thiner_geom,
 
     Returns
     -------
-    coarser_area_shraes:dict
-        Coarser area geometries and percentage of the thiner overlay.
+    coarser_area_shares:pd.Series
+        Percentage of the thiner overlay by coarser area geometry.
     """
     # Reproject in 2D to estimate areas correctly
     coarser_gdf_rep = coarser_geom.to_crs(crs)
     thiner_gdf_rep = thiner_geom.to_crs(crs) 
 
-    coarser_overlay = from_coarser_to_thiner_area(coarser_geom=coarser_gdf_rep, 
-                                                  thiner_geom=thiner_gdf_rep,
-                                                  coarser_idx=coarser_idx, 
-                                                  thiner_idx=thiner_idx)
-    
-    if coarser_tot:
+    areas = intersection_area_matrix(coarser_gdf_rep, thiner_gdf_rep)
+    coarser_ids = coarser_gdf_rep[coarser_idx].to_numpy()
 
-        thiner_overlay_share = coarser_overlay.groupby(coarser_idx)['coarser_share'].sum()
-        coarser_gdf_rep['thiner_ovl_pct'] = coarser_gdf_rep[coarser_idx].map(thiner_overlay_share).fillna(0)
-        coarser_area_thiner_shares = dict(zip(coarser_gdf_rep[coarser_idx], coarser_gdf_rep['thiner_ovl_pct']))
+    if coarser_tot:
+        # percentage of the coarser polygon covered by every thiner one
+        coarser_area = coarser_gdf_rep.geometry.area.to_numpy()
+        shares = (sparse.diags(1 / coarser_area) @ areas) * 100
+        shares.data = shares.data.round(1)
+        thiner_ovl_pct = np.asarray(shares.sum(axis=1)).ravel()
 
-        return coarser_area_thiner_shares
-    
     else:
-        thiner_overlay_area = coarser_overlay.groupby(coarser_idx)['ovl_area'].sum()
-        coarser_gdf_rep['thiner_ovl_areasum'] = coarser_gdf_rep[coarser_idx].map(thiner_overlay_area).fillna(0)
-        total_intersection_areas = coarser_overlay.groupby(thiner_idx)['thiner_area'].last().sum()
-        coarser_gdf_rep['thiner_ovl_pct'] = coarser_gdf_rep['thiner_ovl_areasum']/total_intersection_areas
-        coarser_area_thiner_shares = dict(zip(coarser_gdf_rep[coarser_idx], coarser_gdf_rep['thiner_ovl_pct']))
+        thiner_ovl_areasum = np.asarray(areas.sum(axis=1)).ravel()
+        # total area of the thiner polygons intersecting any coarser polygon,
+        # counted once by thiner id
+        intersected = np.asarray(areas.getnnz(axis=0)).ravel() > 0
+        thiner_area = pd.Series(
+            thiner_gdf_rep.geometry.area.to_numpy()[intersected],
+            index=thiner_gdf_rep[thiner_idx].to_numpy()[intersected],
+        )
+        total_intersection_areas = thiner_area.groupby(level=0).last().sum()
+        thiner_ovl_pct = thiner_ovl_areasum / total_intersection_areas
 
-        return coarser_area_thiner_shares
\ No newline at end of file
+    return pd.Series(thiner_ovl_pct, index=coarser_ids, name='thiner_ovl_pct')
@@ -1,10 +1,15 @@
 import os
 
 import numpy as np
-import geopandas as gpd
-from numpy.random import choice
+import pandas as pd
 
-from CENSAr.datasources import tracts_matching_0110
+from CENSAr.logging import get_logger
+from CENSAr.spatial_distributions.crosswalk import (
+    crosswalk_from_geometries,
+    province_crosswalk,
+)
+
+logger = get_logger(__name__)
 
 DATA_DIR = os.getenv(
     "CENSAR_DATA_DIR",
@@ -66,13 +71,350 @@ def totals_forecast(
         ratio_01 = round(gdf_pers_01["total"].sum() / gdf_var_01["total"].sum(), 2)
         ratio_10 = round(gdf_pers_10["total"].sum() / gdf_var_10["total"].sum(), 2)
         ratio = round((ratio_01 + ratio_10) / 2, 2)
-    print("The ratio persons/dwelling units for {} is {}".format(base_year, ratio))
+    logger.debug(f"The ratio persons/dwelling units for {base_year} is {ratio}")
     proy_totpers = proyections_df.loc[namedept, forecast_year]
     tot_var = int(proy_totpers / ratio)
     return tot_var
 
 
-def distribute_totals_tract(tot_var, weights, catname, forecast_year, gdf):
+def allocate_multinomial(tot_var, probs, caps=None, seed=1, size=None):
+    """
+    Allocates a total number of units among tracts with a single multinomial
+    draw over the tracts probabilities.
+
+    Parameters
+    ----------
+    tot_var : int
+        Total number of households or residential units to be allocated.
+    probs : array-like
+        Tracts probabilities. Missing values are treated as 0 and the
+        vector is normalized to sum 1.
+    caps : array-like, default None
+        Maximum number of units each tract can receive. Units drawn over a
+        tract capacity are drawn again among the tracts with room left.
+    seed : int | np.random.Generator | None, default 1
+        Seed or generator used for the draws.
+    size : int, default None
+        Number of independent realizations drawn in the same batch.
+
+    Returns
+    -------
+    alloc:np.ndarray
+        Number of units by tract, aligned with `probs`. With `size`, an
+        array of shape (size, tracts).
+    """
+    rng = np.random.default_rng(seed)
+    probs = np.nan_to_num(np.asarray(probs, dtype=float))
+    probs = probs / probs.sum()
+    tot_var = int(tot_var)
+
+    if caps is None:
+        return rng.multinomial(tot_var, probs, size=size)
+
+    caps = np.nan_to_num(np.asarray(caps, dtype=float)).astype(np.int64)
+    if tot_var > caps.sum():
+        raise ValueError(
+            f"Total to allocate ({tot_var}) exceeds tracts capacity ({caps.sum()})"
+        )
+
+    alloc = np.zeros((size or 1, len(probs)), dtype=np.int64)
+    remaining = np.full(size or 1, tot_var)
+    while remaining.any():
+        # only realizations with units left are drawn again (full ones have
+        # no tract with room left)
+        active = remaining > 0
+        room = alloc[active] < caps
+        p = np.where(room, probs, 0)
+        # tracts with room left have no probability: spread evenly among them
+        empty = p.sum(axis=1) == 0
+        p[empty] = room[empty]
+        draw = rng.multinomial(remaining[active], p / p.sum(axis=1, keepdims=True))
+        alloc[active] = np.minimum(alloc[active] + draw, caps)
+        remaining = tot_var - alloc.sum(axis=1)
+    return alloc if size else alloc[0]
+
+
+def _round_preserving_total(values, totals):
+    # largest remainder rounding by row: keeps each row total and the bounds
+    # (as long as they are integers)
+    base = np.floor(values)
+    remainder = values - base
+    missing = np.rint(totals - base.sum(axis=1)).astype(np.int64)
+    rank = np.argsort(np.argsort(-remainder, axis=1, kind="stable"), axis=1)
+    return base + (rank < missing[:, None])
+
+
+def constrained_allocation(
+    values, lower=None, upper=None, total=None, integer=False, tol=1e-9, max_iter=100
+):
+    """
+    Reconciles simulated tract values with per-tract bounds and a fixed grand
+    total. Values outside the bounds are clipped and the resulting surplus (or
+    deficit) is redistributed proportionally among the tracts that can still
+    absorb it.
+
+    Parameters
+    ----------
+    values : array-like
+        Simulated values with shape (tracts,) or (realizations, tracts).
+        Missing values are treated as 0.
+    lower : array-like, default None
+        Minimum value by tract (e.g. the previous census value), broadcastable
+        to `values`. Missing values and None mean 0.
+    upper : array-like, default None
+        Maximum value by tract (e.g. the tract total), broadcastable to `values`.
+        Missing values and None mean no limit.
+    total : float | array-like, default None
+        Grand total to be kept by realization. By default the sum of `values`.
+    integer : bool, default False
+        Whether to round the result to integers keeping the grand total.
+    tol : float, default 1e-9
+        Tolerance on the grand total.
+    max_iter : int, default 100
+        Maximum number of redistribution rounds.
+
+    Returns
+    -------
+    reconciled:np.ndarray
+        Values with the same shape as `values` within the bounds and adding up
+        to `total`.
+    """
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    single = values.ndim == 1
+    values = np.atleast_2d(values)
+
+    lower = np.zeros_like(values) if lower is None else np.asarray(lower, dtype=float)
+    lower = np.broadcast_to(np.nan_to_num(lower, nan=0.0), values.shape)
+    upper = np.inf if upper is None else np.asarray(upper, dtype=float)
+    upper = np.broadcast_to(np.nan_to_num(upper, nan=np.inf, posinf=np.inf), values.shape)
+    if (lower > upper).any():
+        raise ValueError("Lower bounds exceed upper bounds for some tracts")
+
+    totals = values.sum(axis=1) if total is None else np.asarray(total, dtype=float)
+    totals = np.broadcast_to(totals, values.shape[:1])
+    if (totals < lower.sum(axis=1) - tol).any() or (totals > upper.sum(axis=1) + tol).any():
+        raise ValueError("Total to allocate is out of the tracts bounds")
+
+    alloc = np.clip(values, lower, upper)
+    for _ in range(max_iter):
+        residual = totals - alloc.sum(axis=1)
+        if (np.abs(residual) <= tol).all():
+            break
+
+        # deficit: take from the room above the lower bounds (never crosses them)
+        room_down = alloc - lower
+        share_down = room_down / np.where(room_down.sum(axis=1) > 0, room_down.sum(axis=1), 1)[:, None]
+
+        # surplus: add in proportion to the current values of tracts with room left
+        free = alloc < upper
+        weights = np.where(free, alloc, 0)
+        empty = weights.sum(axis=1) == 0
+        weights[empty] = free[empty]
+        share_up = weights / np.where(weights.sum(axis=1) > 0, weights.sum(axis=1), 1)[:, None]
+
+        share = np.where((residual < 0)[:, None], share_down, share_up)
+        alloc = np.clip(alloc + residual[:, None] * share, lower, upper)
+
+    if integer:
+        alloc = _round_preserving_total(alloc, totals)
+    return alloc[0] if single else alloc
+
+
+def ipf_shares(shares, totals, targets, tol=1e-8, max_iter=100):
+    """
+    Iterative proportional fitting of tract category shares, so that the
+    expected category totals match the targets while every tract keeps
+    adding up to its total.
+
+    Parameters
+    ----------
+    shares : array-like
+        Category shares by tract with shape (tracts, categories).
+    totals : array-like
+        Total number of units by tract.
+    targets : array-like
+        Expected total by category. Missing values leave the category free:
+        free categories share the remaining units following their current
+        proportions.
+    tol : float, default 1e-8
+        Relative tolerance on the category totals.
+    max_iter : int, default 100
+        Maximum number of fitting rounds.
+
+    Returns
+    -------
+    fitted:np.ndarray
+        Category shares by tract (rows add up to 1).
+    """
+    shares = np.asarray(shares, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    fixed = ~np.isnan(targets)
+    free_total = totals.sum() - targets[fixed].sum()
+    if free_total < 0 or (fixed.all() and not np.isclose(free_total, 0)):
+        raise ValueError(
+            f"Category targets ({targets[fixed].sum()}) do not match "
+            f"the total number of units ({totals.sum()})"
+        )
+
+    for _ in range(max_iter):
+        expected = totals @ shares
+        goal = np.where(fixed, targets, 0.0)
+        if not fixed.all():
+            goal[~fixed] = expected[~fixed] * free_total / max(expected[~fixed].sum(), 1e-12)
+        if np.allclose(expected, goal, rtol=tol, atol=tol):
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factor = np.where(expected > 0, goal / expected, 0.0)
+        shares = shares * factor
+        rows = shares.sum(axis=1, keepdims=True)
+        shares = np.divide(shares, rows, out=np.zeros_like(shares), where=rows > 0)
+    return shares
+
+
+def allocate_categories(totals, shares, targets=None, seed=1, size=None):
+    """
+    Jointly allocates the units of every tract among categories with a
+    multinomial draw by tract, so categories always add up to the tract totals.
+
+    Parameters
+    ----------
+    totals : array-like
+        Total number of units by tract.
+    shares : array-like
+        Category shares by tract with shape (tracts, categories). Missing values
+        are treated as 0 and tracts without shares split evenly.
+    targets : array-like, default None
+        Expected total by category (NaN for free categories, see `ipf_shares`).
+    seed : int | np.random.Generator | None, default 1
+        Seed or generator used for the draws.
+    size : int, default None
+        Number of independent realizations drawn in the same batch.
+
+    Returns
+    -------
+    alloc:np.ndarray
+        Units by tract and category with shape (tracts, categories). With
+        `size`, an array of shape (size, tracts, categories).
+    """
+    rng = np.random.default_rng(seed)
+    totals = np.nan_to_num(np.asarray(totals, dtype=float)).astype(np.int64)
+    shares = np.nan_to_num(np.asarray(shares, dtype=float))
+    shares[shares.sum(axis=1) == 0] = 1
+    shares = shares / shares.sum(axis=1, keepdims=True)
+
+    if targets is not None:
+        shares = ipf_shares(shares, totals, targets)
+        # numerical noise must not break the multinomial pvals check
+        shares = shares / shares.sum(axis=1, keepdims=True)
+
+    shape = None if size is None else (size, len(totals))
+    return rng.multinomial(totals, shares, size=shape)
+
+
+def ensemble_summary(
+    draws, index=None, quantiles=(0.05, 0.5, 0.95), thresholds=None
+):
+    """
+    Summarizes an ensemble of simulated tract values with quantile bands and
+    exceedance probabilities.
+
+    Parameters
+    ----------
+    draws : np.ndarray
+        Simulated values with shape (realizations, tracts).
+    index : array-like, default None
+        Tracts identifiers used as the output index.
+    quantiles : tuple of float, default (0.05, 0.5, 0.95)
+        Quantiles to be estimated by tract.
+    thresholds : dict, default None
+        Name and threshold (scalar or array aligned with the tracts) for which
+        the probability of exceeding it is estimated (e.g. {'informal_2010': arr}).
+
+    Returns
+    -------
+    summary:pd.DataFrame
+        Mean, quantiles (`q05`, `q50`, ...) and exceedance probabilities
+        (`p_gt_<name>`) by tract.
+    """
+    summary = pd.DataFrame({"mean": draws.mean(axis=0)}, index=index)
+    bands = np.quantile(draws, quantiles, axis=0)
+    for q, band in zip(quantiles, bands):
+        summary[f"q{round(q * 100):02d}"] = band
+
+    for name, threshold in (thresholds or {}).items():
+        threshold = np.asarray(threshold, dtype=float)
+        summary[f"p_gt_{name}"] = (draws > threshold).mean(axis=0)
+    return summary
+
+
+def ensemble_totals_tract(
+    tot_var,
+    weights,
+    gdf,
+    n_realizations,
+    catname=None,
+    caps=None,
+    seed=1,
+    quantiles=(0.05, 0.5, 0.95),
+    thresholds=None,
+):
+    """
+    Draws an ensemble of tract allocations in one batched multinomial call.
+
+    Parameters
+    ----------
+    tot_var : int
+        Total number of households or residential units to be distributed by tract.
+    weights : array-like | None
+        Tracts probabilites aligned with `gdf` rows. If None, the observed
+        distribution of `catname` is used.
+    gdf : gpd.GeoDataFrame
+        Geodataframe where the new variable by tract will be created.
+    n_realizations : int
+        Number of realizations.
+    catname : str, default None
+        Name of the column to be used as reference distribution.
+    caps : array-like, default None
+        Maximum number of units by tract, aligned with `gdf` rows.
+    seed : int | np.random.Generator | None, default 1
+        Seed or generator used for the draws.
+    quantiles : tuple of float, default (0.05, 0.5, 0.95)
+        Quantiles to be estimated by tract.
+    thresholds : dict, default None
+        Exceedance thresholds by name (see `ensemble_summary`).
+
+    Returns
+    -------
+    ensemble:dict
+        `link` tracts identifiers, `draws` (realizations x tracts) array and
+        `summary` dataframe with quantile bands and exceedance probabilities.
+    """
+    gdf_reset = gdf.reset_index()
+    if weights is None:
+        weights = _observed_weights(gdf_reset, catname)
+
+    links = gdf_reset["link"].to_numpy()
+    draws = allocate_multinomial(
+        tot_var, weights, caps=caps, seed=seed, size=n_realizations
+    )
+    summary = ensemble_summary(
+        draws, index=links, quantiles=quantiles, thresholds=thresholds
+    )
+    return {"link": links, "draws": draws, "summary": summary}
+
+
+def _observed_weights(gdf, catname):
+    """
+    Tracts probabilities following the observed distribution of a column.
+    """
+    dist = gdf[f"{catname}"] / gdf[f"{catname}"].sum()
+    return dist.fillna(0) / dist.sum()
+
+
+def distribute_totals_tract(
+    tot_var, weights, catname, forecast_year, gdf, caps=None, seed=1
+):
     """
     Returns the projected number of households or residential units
     distributed by census tract based on .
@@ -81,45 +423,75 @@ def distribute_totals_tract(tot_var, weights, catname, forecast_year, gdf):
     ----------
     tot_var : int
         Total number of households or residential units to be distributed by tract.
-    weights : dict
-        Tracts probabilites defined based on observed distributions.
+    weights : array-like | None
+        Tracts probabilities aligned with `gdf` rows (e.g. from `var_forecast`).
+        If None, the observed distribution of `catname` in `gdf` is used.
     catname : str
         Name of the column to be used as reference distribution.
     forecast_year : str
         Year of projected total.
     gdf : gpd.GeoDataFrame
-        Geodataframe where the new variable by tract will be created (e.g. 2010 or 2020)
+        Geodataframe where the new variable by tract will be created (e.g. 2010 or 2020),
+        with a `link` column or index.
+    caps : array-like, default None
+        Maximum number of units by tract, aligned with `gdf` rows.
+    seed : int | np.random.Generator | None, default 1
+        Seed or generator used for the draws.
 
     Returns
     -------
     totals_by_tract:pd.Series
-        Total number or target category of households/residential units by tract.
+        Total number or target category of households/residential units by tract,
+        indexed by the `gdf` tract links in row order and named
+        `<catname>_<forecast_year>`.
     """
     gdf_reset = gdf.reset_index().copy()
 
     if weights is None:
-        # Gets observed distribution
-        gdf_reset[f"{catname}_dist"] = (
-            gdf_reset[f"{catname}"] / gdf_reset[f"{catname}"].sum()
-        )
-        weights = (
-            gdf_reset[f"{catname}_dist"].fillna(0) / gdf_reset[f"{catname}_dist"].sum()
-        )
+        weights = _observed_weights(gdf_reset, catname)
 
-    np.random.seed(1)
-    drawn_tracts = choice(gdf_reset["link"], tot_var, p=weights)
-    totals_tract = np.unique(drawn_tracts, return_counts=True)
-    proj_totals = dict(zip(totals_tract[0], totals_tract[1]))
+    proj_totals = allocate_multinomial(tot_var, weights, caps=caps, seed=seed)
 
-    gdf_reset[f"{catname}_{forecast_year}"] = (
-        gdf_reset["link"].map(proj_totals).fillna(0)
-    )
-    totals_by_tract = dict(
-        zip(gdf_reset["link"], gdf_reset[f"{catname}_{forecast_year}"])
+    totals_by_tract = pd.Series(
+        proj_totals.astype(float),
+        index=gdf_reset["link"].to_numpy(),
+        name=f"{catname}_{forecast_year}",
     )
     return totals_by_tract
 
 
+def tract_positions(ids, index):
+    """
+    Translates tract identifiers into integer positions of another tracts index.
+
+    Parameters
+    ----------
+    ids : array-like
+        Tracts identifiers to be translated (e.g. the `link_2010` column of the
+        geodataframe where a variable is being simulated).
+    index : array-like | pd.Index
+        Tracts identifiers of the reference geodataframe.
+
+    Returns
+    -------
+    positions:np.ndarray
+        Position of every id in `index` (-1 when the tract is not found).
+    """
+    index = pd.Index(index)
+    if not index.is_unique:
+        duplicated = index[index.duplicated()].unique()[:10].tolist()
+        raise ValueError(f"Tracts index must be unique, duplicated tracts: {duplicated}")
+    return index.get_indexer(np.asarray(ids))
+
+
+def take_positions(values, positions):
+    """
+    Aligns values to a crosswalk of integer positions (NaN where missing).
+    """
+    values = np.asarray(values, dtype=float)
+    return np.where(positions >= 0, values[positions], np.nan)
+
+
 def observed_dist(catname, idx_col, base_year, gdf_base, gdf_forecast):
     """
     Returns observed percentages by tract for a given variable distribution.
@@ -134,9 +506,8 @@ def observed_dist(catname, idx_col, base_year, gdf_base, gdf_forecast):
         Name of the tracts index column in the geodataframe where the category
         is being simulated.
     base_year : str
-        Year to be used for the new simulated column naming. For example,
-        'casilla_2010'. This number identifies in the simulated geodataframe the
-        year used as based distribution.
+        Year of the observed distribution, used to pick the category name
+        when `catname` is a dict.
     gdf_base : gpd.GeoDataFrame
         Geodataframe housing the category by tract used as observed distribution
     gdf_forecast : gdp.GeoDataFrame
@@ -144,26 +515,32 @@ def observed_dist(catname, idx_col, base_year, gdf_base, gdf_forecast):
 
     Returns
     -------
-    var_tract:dict
-        Probabilities distribution by tract (e.g. {'22007213': 0.4}).
+    var_tract:pd.Series
+        Probabilities by tract indexed like `gdf_forecast` (NaN for tracts
+        not observed in `gdf_base`). If no `gdf_forecast` is given,
+        probabilities indexed by `gdf_base` tracts.
     """
     if type(catname) is dict:
         # overwrites category name based on the observed year
         catname = catname[base_year]
     tract_pct = gdf_base[catname] / gdf_base[catname].sum()
-    cat_dist = dict(zip(tract_pct.index, tract_pct.values))
 
     if gdf_forecast is not None:
-        gdf_reset = gdf_forecast.reset_index()
-        var_pct = round(gdf_reset[idx_col].map(cat_dist).astype(float), 4)
-        gdf_reset[f"{catname}_{base_year}"] = var_pct
-        var_tract = dict(zip(gdf_reset[idx_col], gdf_reset[f"{catname}_{base_year}"]))
-        return var_tract
+        if idx_col in gdf_forecast.columns:
+            ids = gdf_forecast[idx_col]
+        else:
+            ids = gdf_forecast.index.get_level_values(idx_col)
+        positions = tract_positions(ids, gdf_base.index)
+        return pd.Series(
+            np.round(take_positions(tract_pct, positions), 4),
+            index=gdf_forecast.index,
+            name=f"{catname}_{base_year}",
+        )
 
     else:
-        return cat_dist
+        return tract_pct
+
 
-    
 def var_forecast(
     gdf_2001, gdf_2010, catname, gdf_2020, pct_target, base_year, 
     tot_colname, calibration_vector={'weights':None, 'mix_dist':False}):
@@ -199,79 +576,72 @@ def var_forecast(
     -------
     totcat:int
         Total number of residential units or households for a given category.
-    weights: pd.Series
+    weights: np.ndarray
+        Tracts probabilities aligned with `gdf_2020` rows.
     """
     if gdf_2010.equals(gdf_2020):
         # 2020 geometries are not available
         idx_col = "link"
-        gdf_2020 = gdf_2020.reset_index().copy()
     else:
         # 2020 geometries are available
         if base_year not in ["2001", "2010"]:
             idx_col = "link"
         else:
             idx_col = f"link_{base_year}"
+    if idx_col not in gdf_2020.columns:
+        gdf_2020 = gdf_2020.reset_index()
 
-    if base_year == "2001":
-        dist_dict = observed_dist(
+    if base_year in ["2001", "2010"]:
+        data = {"2001": gdf_2001, "2010": gdf_2010}
+        dist_var = observed_dist(
             catname=catname,
             idx_col=idx_col,
+            base_year=base_year,
+            gdf_base=data[base_year],
+            gdf_forecast=gdf_2020,
+        ).to_numpy()
+
+    else:
+        # middle beetwen 01 and 10
+        dist_01 = observed_dist(
+            catname=catname,
+            idx_col="link_2001",
             base_year="2001",
             gdf_base=gdf_2001,
             gdf_forecast=gdf_2020,
-        )  # 2001 distribution
-        gdf_2020[f"{catname}_2001"] = gdf_2020[idx_col].map(dist_dict)
-        dist_var = gdf_2020[f"{catname}_2001"]
-
-    elif base_year == "2010":
-        dist_dict = observed_dist(
+        ).to_numpy()
+        dist_10 = observed_dist(
             catname=catname,
-            idx_col=idx_col,
+            idx_col="link_2010",
             base_year="2010",
             gdf_base=gdf_2010,
             gdf_forecast=gdf_2020,
-        )  # 2010 distribution
-        gdf_2020[f"{catname}_2010"] = gdf_2020[idx_col].map(dist_dict)
-        dist_var = gdf_2020[f"{catname}_2010"]
+        ).to_numpy()
+        dist_var = np.round((dist_01 + dist_10) / 2, 4)
 
-    else:
-        data = {"2001": gdf_2001, "2010": gdf_2010}
-        for year in ["2001", "2010"]:
-            if idx_col == "link":
-                idx_col_year = f"link_{year}"
-            dist_dict = observed_dist(
-                catname=catname,
-                idx_col=idx_col_year,
-                base_year=year,
-                gdf_base=data[year],
-                gdf_forecast=gdf_2020,
-            )
-            
-            gdf_2020[f"var_{year}"] = gdf_2020[idx_col_year].map(dist_dict)
-
-        gdf_2020["var_0110"] = round(
-            (gdf_2020["var_2001"] + gdf_2020["var_2010"]) / 2, 4
-        )  # middle beetwen 01 and 10 
-        dist_var = gdf_2020[f"var_0110"]
-
-    if calibration_vector['weights']: 
-        gdf_2020['calibration_weights'] = gdf_2020[idx_col].map(calibration_vector['weights'])
+    if calibration_vector['weights'] is not None and len(calibration_vector['weights']):
+        calibration = pd.Series(calibration_vector['weights'])
+        calibration_weights = take_positions(
+            calibration, tract_positions(gdf_2020[idx_col], calibration.index)
+        )
 
         # distribution based on the spatial relation with calibration 
-        calibration_dist_var =  gdf_2020['calibration_weights'].fillna(1)/gdf_2020['calibration_weights'].sum() 
-        
+        calibration_dist_var = (
+            np.where(np.isnan(calibration_weights), 1, calibration_weights)
+            / np.nansum(calibration_weights)
+        )
+
         # mix observed 2001 & 2010 distributions with intersected calibration polygons
         if calibration_vector['mix_dist']:
-            dist_var_ = round((dist_var + calibration_dist_var)/2, 4)
-            dist_var = dist_var_.copy() 
+            dist_var = np.round((dist_var + calibration_dist_var) / 2, 4)
         else:
             # use calibration vector only
-            dist_var = calibration_dist_var.copy()
+            dist_var = calibration_dist_var
 
     totcat = int(
         gdf_2020[tot_colname].sum() * pct_target / 100
     )  # total number to be distributed by tract
-    weights = dist_var.fillna(0) / dist_var.sum()
+    weights = np.nan_to_num(dist_var) / np.nansum(dist_var)
     
     return totcat, weights
 
@@ -285,6 +655,7 @@ def simulate_total_var(
     gdf_var_01=None,
     gdf_pers_10=None,
     gdf_var_10=None,
+    n_realizations=None,
     ):
     """
     Distributes the projected number of households or residential units by tract
@@ -310,19 +681,23 @@ def simulate_total_var(
         Geodataframe of 2010 Census with total number of persons by tract.
     gdf_var_10 : gpd.GeoDataFrame, default None
         Geodataframe of 2010 Census with households or residential units by tract.
+    n_realizations : int, default None
+        If given, draws an ensemble of realizations (see `ensemble_totals_tract`)
+        instead of a single one.
 
     Returns
     -------
-    sim_dist:pd.Series
-          Total number of households/residential units by tract.
+    sim_dist:pd.Series | dict
+          Total number of households/residential units by tract, or the
+          ensemble draws and summary.
     """
     if 'user_defined' in estimate_totals.keys():
-        print("Using population totals defined by the user")
+        logger.debug("Using population totals defined by the user")
         proj_total = estimate_totals['user_defined']
         weights = estimate_totals['weights']
     
     else:
-        print("Estimating population totals")
+        logger.debug("Estimating population totals")
         # Get number of households or residential units based on persons projection
         proj_total = totals_forecast(
             gdf_pers_01,
@@ -336,7 +711,19 @@ def simulate_total_var(
         )
         weights = None
     
-    print(f"The total number of projected households/residential units is {proj_total}")
+    logger.debug(
+        f"The total number of projected households/residential units is {proj_total}",
+        extra={"proj_total": int(proj_total)},
+    )
+
+    if n_realizations:
+        return ensemble_totals_tract(
+            tot_var=proj_total,
+            weights=weights,
+            gdf=gdf_var_10,
+            n_realizations=n_realizations,
+            catname=catname,
+        )
 
     # And follows the observed total households or residential units distribution in the 2010 tracts
     sim_dist = distribute_totals_tract(
@@ -358,7 +745,8 @@ def simulate_cat_var(
     pct_val,
     catname,
     tot_colname,
-    calibration_vector={'weights':None, 'mix_dist':False}):
+    calibration_vector={'weights':None, 'mix_dist':False},
+    n_realizations=None):
     """
     Distributes the estimated number of households or residential units by tract
     following the same distribution in the most recent census information.
@@ -388,11 +776,15 @@ def simulate_cat_var(
         the category is being simulated.
     calibration_vector : dict, default "{'weights':None, 'mix_dist':False}"
         Percentage of tract geometries intersected by other polygons.
+    n_realizations : int, default None
+        If given, draws an ensemble of realizations (see `ensemble_totals_tract`)
+        instead of a single one.
 
     Returns
     -------
-    sim_dist:pd.Series
-          Total number of target category household/units by tract.
+    sim_dist:pd.Series | dict
+          Total number of target category household/units by tract, or the
+          ensemble draws and summary.
     """
     # Calculate tract distribution based on coarser area total
     cat_var, probs = var_forecast(
@@ -405,7 +797,15 @@ def simulate_cat_var(
         tot_colname=tot_colname,
         calibration_vector = calibration_vector
     )
-    
+
+    if n_realizations:
+        return ensemble_totals_tract(
+            tot_var=cat_var,
+            weights=probs,
+            gdf=forecast_gdf,
+            n_realizations=n_realizations,
+        )
+
     sim_dist = distribute_totals_tract(
         tot_var=cat_var,
         weights=probs,
@@ -416,7 +816,210 @@ def simulate_cat_var(
     return sim_dist
 
 
-def tracts_2020_to_2010(tracts_2020_gdf, tracts_2010_gdf):
+def observed_shares(gdf_base, categories, idx_col, gdf_forecast):
+    """
+    Returns the observed category shares of every tract aligned with
+    `gdf_forecast` rows (NaN where the tract was not observed).
+    """
+    counts = gdf_base[categories].to_numpy(dtype=float)
+    rows = np.nansum(counts, axis=1, keepdims=True)
+    shares = np.divide(counts, rows, out=np.full_like(counts, np.nan), where=rows > 0)
+    positions = tract_positions(gdf_forecast[idx_col], gdf_base.index)
+    aligned = shares[positions]
+    aligned[positions < 0] = np.nan
+    return aligned
+
+
+def simulate_joint_cat_var(
+    gdf_var_01,
+    gdf_var_10,
+    base_year,
+    forecast_gdf,
+    categories,
+    tot_colname,
+    pct_vals=None,
+    seed=1,
+    n_realizations=None):
+    """
+    Distributes the households or residential units of every tract among
+    several categories at once, following the category mix observed by tract
+    and keeping the tract totals.
+
+    Parameters
+    ----------
+    gdf_var_01 : gpd.GeoDataFrame
+        Geodataframe of 2001 Census with household or residential units by tract.
+    gdf_var_10 : gpd.GeoDataFrame
+        Geodataframe of 2010 Census with household or residential units by tract.
+    base_year : str
+        Reference year to define the observed category mix by tract. If none of
+        2001 or 2010 are selected, the average between them is used.
+    forecast_gdf : gpd.GeoDataFrame
+        Census geodataframe where the categories are being simulated, with
+        `link_2001` and `link_2010` columns.
+    categories : list[str]
+        Names of the categories (e.g. the `tipo vivienda particular` aggregation).
+    tot_colname : str
+        Name of the total variables column in `forecast_gdf`.
+    pct_vals : dict, default None
+        Percentage over the total units targeted for some categories
+        (e.g. {'informal': 4.55}). The remaining categories share the rest.
+    seed : int | np.random.Generator | None, default 1
+        Seed or generator used for the draws.
+    n_realizations : int, default None
+        If given, draws an ensemble of realizations in the same batch.
+
+    Returns
+    -------
+    sim_dist:pd.DataFrame | dict
+        Units by tract (rows) and category (columns), or the ensemble
+        `link` identifiers, (realizations x tracts x categories) `draws` and
+        `summary` dataframe by category.
+    """
+    gdf_reset = forecast_gdf.reset_index() if "link" not in forecast_gdf.columns else forecast_gdf
+    links = gdf_reset["link"].to_numpy()
+
+    data = {"2001": gdf_var_01, "2010": gdf_var_10}
+    years = [base_year] if base_year in data else ["2001", "2010"]
+    observed = np.stack(
+        [observed_shares(data[year], categories, f"link_{year}", gdf_reset) for year in years]
+    )
+    # average between years, using the observed one where the other is missing
+    counts = (~np.isnan(observed)).sum(axis=0)
+    shares = np.divide(
+        np.nansum(observed, axis=0), counts, out=np.full(counts.shape, np.nan), where=counts > 0
+    )
+
+    # tracts without observations follow the citywide mix
+    citywide = np.nansum(gdf_var_10[categories].to_numpy(dtype=float), axis=0)
+    missing = np.isnan(shares).all(axis=1)
+    shares[missing] = citywide / citywide.sum()
+
+    totals = np.nan_to_num(gdf_reset[tot_colname].to_numpy(dtype=float))
+    targets = None
+    if pct_vals:
+        targets = np.array(
+            [totals.sum() * pct_vals[cat] / 100 if cat in pct_vals else np.nan for cat in categories]
+        )
+
+    draws = allocate_categories(totals, shares, targets=targets, seed=seed, size=n_realizations)
+
+    if n_realizations:
+        summary = pd.concat(
+            {cat: ensemble_summary(draws[..., k], index=links) for k, cat in enumerate(categories)},
+            axis=1,
+        )
+        return {"link": links, "draws": draws, "summary": summary}
+
+    return pd.DataFrame(draws.astype(float), index=links, columns=categories)
+
+
+def sweep_cat_var(
+    gdf_var_01,
+    gdf_var_10,
+    forecast_gdf,
+    catname,
+    tot_colname,
+    pct_vals,
+    base_years=("2001", "2010", "0110"),
+    mix_dist=(True, False),
+    calibration_weights=None,
+    seed=1,
+    n_realizations=None):
+    """
+    Simulates a category over a grid of parameters (percentage over the total,
+    base year and calibration mixing) in one batch. Observed and calibration
+    distributions are computed once and every grid point is drawn with a
+    single broadcast multinomial call.
+
+    Parameters
+    ----------
+    gdf_var_01 : gpd.GeoDataFrame
+        Geodataframe of 2001 Census with household or residential units by tract.
+    gdf_var_10 : gpd.GeoDataFrame
+        Geodataframe of 2010 Census with household or residential units by tract.
+    forecast_gdf : gpd.GeoDataFrame
+        Census geodataframe where the category is being simulated, with
+        `link`, `link_2001` and `link_2010` columns.
+    catname : str | dict
+        Name of the column to be used as reference distribution. Or dictionary
+        following the year of the distribution and the category name.
+    tot_colname : str
+        Name of the total variables column in `forecast_gdf`.
+    pct_vals : list[float]
+        Percentages of the category over the total units (e.g. [2, 3, 4]).
+    base_years : list[str], default ("2001", "2010", "0110")
+        Observed distributions ("0110" is the average between both censuses).
+    mix_dist : list[bool], default (True, False)
+        Whether the observed distribution is mixed with the calibration
+        vector (True) or replaced by it (False). Ignored without
+        `calibration_weights`.
+    calibration_weights : pd.Series | dict, default None
+        Percentage of tract geometries intersected by other polygons, indexed
+        by tract link.
+    seed : int | np.random.Generator | None, default 1
+        Seed or generator used for the draws.
+    n_realizations : int, default None
+        Number of realizations drawn for every grid point.
+
+    Returns
+    -------
+    sweep:pd.DataFrame
+        Units by grid point (rows indexed by `pct_val`, `base_year`, `mix_dist`
+        and `realization` when given) and tract (columns).
+    """
+    gdf_reset = forecast_gdf.reset_index() if "link" not in forecast_gdf.columns else forecast_gdf
+    links = gdf_reset["link"].to_numpy()
+    data = {"2001": gdf_var_01, "2010": gdf_var_10}
+
+    observed = {
+        year: observed_dist(catname, f"link_{year}", year, data[year], gdf_reset).to_numpy()
+        for year in ("2001", "2010")
+    }
+    observed["0110"] = np.round((observed["2001"] + observed["2010"]) / 2, 4)
+
+    calibration_dist = None
+    if calibration_weights is not None and len(calibration_weights):
+        calibration = pd.Series(calibration_weights)
+        calibration = take_positions(calibration, tract_positions(links, calibration.index))
+        calibration_dist = np.where(np.isnan(calibration), 1, calibration) / np.nansum(calibration)
+    else:
+        mix_dist = (True,)
+
+    dists = []
+    for year in base_years:
+        for mix in mix_dist:
+            if calibration_dist is None:
+                dist = observed[year]
+            elif mix:
+                dist = np.round((observed[year] + calibration_dist) / 2, 4)
+            else:
+                dist = calibration_dist
+            dists.append(np.nan_to_num(dist) / np.nansum(dist))
+    probs = np.stack(dists).reshape(len(base_years), len(mix_dist), len(links))
+
+    total = gdf_reset[tot_colname].sum()
+    totcats = np.array([int(total * pct / 100) for pct in pct_vals])
+
+    rng = np.random.default_rng(seed)
+    grid = (len(pct_vals), len(base_years), len(mix_dist))
+    size = grid if n_realizations is None else (n_realizations, *grid)
+    totcats = np.broadcast_to(totcats[:, None, None], grid)
+    draws = rng.multinomial(totcats, probs[None], size=size)
+
+    names = ["pct_val", "base_year", "mix_dist"]
+    levels = [list(pct_vals), list(base_years), list(mix_dist)]
+    if n_realizations is not None:
+        # realizations last in the row index
+        draws = np.moveaxis(draws, 0, 3)
+        names.append("realization")
+        levels.append(list(range(n_realizations)))
+
+    index = pd.MultiIndex.from_product(levels, names=names)
+    return pd.DataFrame(draws.reshape(len(index), len(links)), index=index, columns=links)
+
+
+def tracts_2020_to_2010(tracts_2020_gdf, tracts_2010_gdf, crosswalk=None):
     """
     Matches 2020 with 2010 census tract geometries.
 
@@ -426,43 +1029,28 @@ def tracts_2020_to_2010(tracts_2020_gdf, tracts_2010_gdf):
         Geodataframe with 2020 census tract geometries.
     tracts_2010_gdf : gdp.GeoDataFrame
         Geodataframe with 2010 census tract geometries.
+    crosswalk : Crosswalk, default None
+        Precomputed 2010 -> 2020 crosswalk. If None, 2020 tracts are linked to
+        the 2010 tract containing their centroid (or the nearest one).
 
     Returns
     -------
     tracts_2020_gdf:gpd.GeoDataFrame
         Geodataframe with 2020 census tract geometries and 2010 link column.
     """
-    tracts_2020_gdf_ = tracts_2020_gdf[["link", "geometry"]].copy()
-    tracts_2020_gdf_rep = tracts_2020_gdf_.to_crs(tracts_2010_gdf.crs)
-    tracts_2020_gdf_rep["geometry"] = tracts_2020_gdf_rep.geometry.centroid
-    tracts_20_to_10 = gpd.sjoin(
-        tracts_2020_gdf_rep, tracts_2010_gdf, predicate="within"
-    )
-    
-    tracts_20_to_10.rename(
-        columns={"link_left": "link_2020", "link_right": "link_2010"}, inplace=True
-    )
-
-    tracts_2010 = dict(zip(tracts_20_to_10.link_2020, tracts_20_to_10.link_2010))
-    tracts_2020_gdf["link_2010"] = tracts_2020_gdf.link.map(tracts_2010)
-
-    # Assign the idx of the nearest tract
-    NaN2020 = tracts_2020_gdf[tracts_2020_gdf["link_2010"].isna()].copy()
-    NaN2020["geometry"] = NaN2020.geometry.centroid
-
-    tracts_missing = NaN2020.to_crs(tracts_2010_gdf.crs).sjoin_nearest(tracts_2010_gdf)
-    tracts_missing.rename(
-        columns={"link_left": "link_2020", "link_right": "link_2010_"}, inplace=True
-    )
-    tracts_nearest = dict(zip(tracts_missing.link_2020, tracts_missing.link_2010_))
-
-    tracts_2020_gdf["link_2010"].fillna(
-        tracts_2020_gdf["link"].map(tracts_nearest), inplace=True
-    )
+    if crosswalk is None:
+        crosswalk = crosswalk_from_geometries(
+            source_gdf=tracts_2010_gdf,
+            target_gdf=tracts_2020_gdf,
+            crs=tracts_2010_gdf.crs,
+            method="centroid",
+        )
+    link_2010 = crosswalk.target_link()
+    tracts_2020_gdf["link_2010"] = link_2010.reindex(tracts_2020_gdf["link"]).to_numpy()
     return tracts_2020_gdf
 
 
-def tracts_2010_to_2001(tracts_2020_gdf, prov_name):
+def tracts_2010_to_2001(tracts_2020_gdf, prov_name, crosswalk=None):
     """
     Creates 2001 census link column for the 2020 census geodataframe.
 
@@ -470,6 +1058,11 @@ def tracts_2010_to_2001(tracts_2020_gdf, prov_name):
     ----------
     tracts_2020_gdf : gpd.GeoDataFrame
         Geodataframe with 2020 census tract geometries.
+    prov_name : str
+        Province name used to load the 2001 -> 2010 tracts pairing.
+    crosswalk : Crosswalk, default None
+        Precomputed 2001 -> 2010 crosswalk. If None, the persisted province
+        crosswalk is used (and built from the pairing table the first time).
 
     Returns
     -------
@@ -479,12 +1072,13 @@ def tracts_2010_to_2001(tracts_2020_gdf, prov_name):
 
     if "link_2010" not in tracts_2020_gdf.columns:
         raise TypeError("GeoDataFrame must contain 2010 census link reference")
-    
-    df = tracts_matching_0110(
-        prov=prov_name,
-        var_types={"Link01": object, "Link10": object},
-        root=DATA_DIR,
+
+    if crosswalk is None:
+        crosswalk = province_crosswalk(
+            prov=prov_name, source_year=2001, target_year=2010, data_root=DATA_DIR
+        )
+    link_2001 = crosswalk.target_link()
+    tracts_2020_gdf["link_2001"] = (
+        link_2001.reindex(tracts_2020_gdf["link_2010"]).to_numpy()
     )
-    link2001 = dict(zip(df.Link10, df.Link01))
-    tracts_2020_gdf["link_2001"] = tracts_2020_gdf["link_2010"].map(link2001)
     return tracts_2020_gdf
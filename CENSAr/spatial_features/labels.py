@@ -0,0 +1,175 @@
+import numpy as np
+import geopandas as gpd
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.axes import Axes
+from matplotlib.text import Text
+from matplotlib.transforms import Bbox, IdentityTransform
+
+
+class LabelCollection(Artist):
+    """
+    Many text labels drawn by a single artist: positions are transformed in
+    one vectorized call and the labels are rendered with one reused `Text`,
+    so hundreds of labels do not add hundreds of artists to the axes.
+
+    ...
+
+    Attributes
+    ----------
+    cull : bool
+        Whether to skip labels overlapping an already drawn one (labels are
+        drawn by decreasing `priority`).
+    drawn : np.ndarray
+        Positions of the labels drawn in the last render.
+
+    Methods
+    -------
+    get_window_extent(renderer):
+        Bounding box of the drawn labels.
+    """
+
+    zorder = 3
+
+    def __init__(self, x, y, labels, cull: bool = False, priority=None, **text_kwargs):
+        super().__init__()
+        self._xy = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+        self._labels = [str(label) for label in labels]
+        if priority is None:
+            order = np.arange(len(self._labels))
+        else:
+            order = np.argsort(-np.asarray(priority), kind="stable")
+        self._order = order[np.isfinite(self._xy[order]).all(axis=1)]
+        self.cull = cull
+        self.drawn = np.empty(0, dtype=int)
+        self._text = Text(**text_kwargs)
+        self._text.set_transform(IdentityTransform())
+
+    def set_figure(self, fig):
+        super().set_figure(fig)
+        self._text.set_figure(fig)
+
+    def _extent(self, renderer):
+        # text extent including its bbox patch (e.g. boxstyle='round')
+        extent = self._text.get_window_extent(renderer)
+        patch = self._text.get_bbox_patch()
+        if patch is not None:
+            self._text.update_bbox_position_size(renderer)
+            extent = Bbox.union([extent, patch.get_window_extent(renderer)])
+        return extent
+
+    def _layout(self, renderer):
+        # yields the labels to be drawn, with the reused text already placed
+        xy = self.get_transform().transform(self._xy)
+        boxes = np.empty((len(self._order), 4))
+        kept = 0
+        for i in self._order:
+            self._text.set_position(xy[i])
+            self._text.set_text(self._labels[i])
+            if self.cull:
+                x0, y0, x1, y1 = self._extent(renderer).extents
+                placed = boxes[:kept]
+                if (
+                    (placed[:, 0] < x1) & (placed[:, 2] > x0) & (placed[:, 1] < y1) & (placed[:, 3] > y0)
+                ).any():
+                    continue
+                boxes[kept] = x0, y0, x1, y1
+                kept += 1
+            yield i
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        renderer.open_group("labels", gid=self.get_gid())
+        self._text.set_clip_box(self.get_clip_box())
+        drawn = []
+        for i in self._layout(renderer):
+            self._text.draw(renderer)
+            drawn.append(i)
+        self.drawn = np.array(drawn, dtype=int)
+        renderer.close_group("labels")
+        self.stale = False
+
+    def get_window_extent(self, renderer=None):
+        if renderer is None:
+            renderer = self.figure._get_renderer()
+        boxes = [self._extent(renderer) for _ in self._layout(renderer)]
+        return Bbox.union(boxes) if boxes else Bbox.null()
+
+
+def label_points(
+    ax: Axes,
+    x,
+    y,
+    labels,
+    cull: bool = False,
+    priority=None,
+    **text_kwargs,
+) -> LabelCollection:
+    """
+    Adds text labels at data coordinates through one `LabelCollection`.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes to be labeled.
+    x, y : array-like
+        Label positions in data coordinates.
+    labels : array-like
+        Label texts.
+    cull : bool, default False
+        Whether to skip labels overlapping an already drawn one.
+    priority : array-like, default None
+        Drawing order when culling (higher first). Labels order by default.
+    **text_kwargs
+        `matplotlib.text.Text` properties (e.g. fontsize, bbox).
+
+    Returns
+    -------
+    labels:LabelCollection
+        Artist added to the axes.
+    """
+    collection = LabelCollection(x, y, labels, cull=cull, priority=priority, **text_kwargs)
+    collection.set_transform(ax.transData)
+    ax.add_artist(collection)
+    return collection
+
+
+def label_polygons(
+    ax: Axes,
+    gdf: gpd.GeoDataFrame,
+    column: str,
+    cull: bool = False,
+    priority: str | None = None,
+    **text_kwargs,
+) -> LabelCollection:
+    """
+    Labels every polygon at its representative point (always inside the
+    polygon), computed for the whole layer in one call.
+
+    Parameters
+    ----------
+    ax : matplotlib.axes.Axes
+        Axes the layer is drawn in.
+    gdf : gpd.GeoDataFrame
+        Polygons to be labeled, in the crs of the drawn layer.
+    column : str
+        Name of the column with the labels (e.g. "grupo").
+    cull : bool, default False
+        Whether to skip labels overlapping an already drawn one.
+    priority : str, default None
+        Column ordering the labels when culling (e.g. area or population,
+        higher first).
+    **text_kwargs
+        `matplotlib.text.Text` properties (e.g. fontsize, bbox).
+    """
+    points = gdf.geometry.representative_point()
+    return label_points(
+        ax,
+        points.x.to_numpy(),
+        points.y.to_numpy(),
+        gdf[column].to_numpy(),
+        cull=cull,
+        priority=None if priority is None else gdf[priority].to_numpy(),
+        **text_kwargs,
+    )
@@ -0,0 +1,181 @@
+import json
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+
+def _quantize(coords, bounds, quantization):
+    xmin, ymin, xmax, ymax = bounds
+    kx = (xmax - xmin) / (quantization - 1) if xmax > xmin else 1.0
+    ky = (ymax - ymin) / (quantization - 1) if ymax > ymin else 1.0
+    qx = np.round((coords[:, 0] - xmin) / kx).astype(np.int64)
+    qy = np.round((coords[:, 1] - ymin) / ky).astype(np.int64)
+    return qx, qy, [kx, ky], [xmin, ymin]
+
+
+def _ring_points(polygons, bounds, quantization):
+    # quantized vertices of every ring (without the closing vertex nor repeated ones)
+    rings, ring_part = shapely.get_rings(polygons, return_index=True)
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    qx, qy, scale, translate = _quantize(coords, bounds, quantization)
+
+    closing = np.r_[ring_idx[1:] != ring_idx[:-1], True]
+    qx, qy, ring_idx = qx[~closing], qy[~closing], ring_idx[~closing]
+    repeated = np.r_[False, (ring_idx[1:] == ring_idx[:-1]) & (qx[1:] == qx[:-1]) & (qy[1:] == qy[:-1])]
+    qx, qy, ring_idx = qx[~repeated], qy[~repeated], ring_idx[~repeated]
+
+    # the last vertex may have collapsed onto the first one
+    starts = np.flatnonzero(np.r_[True, ring_idx[1:] != ring_idx[:-1]])
+    ends = np.r_[starts[1:], len(ring_idx)] - 1
+    collapsed = ends[(ends > starts) & (qx[ends] == qx[starts]) & (qy[ends] == qy[starts])]
+    keep = np.ones(len(ring_idx), dtype=bool)
+    keep[collapsed] = False
+    return qx[keep], qy[keep], ring_idx[keep], ring_part, len(rings), scale, translate
+
+
+def _junctions(pid, ring_idx, n_points):
+    # vertices with more than two distinct neighbours split rings into arcs
+    starts = np.r_[True, ring_idx[1:] != ring_idx[:-1]]
+    first = np.maximum.accumulate(np.where(starts, np.arange(len(pid)), 0))
+    ends = np.r_[ring_idx[1:] != ring_idx[:-1], True]
+    nxt = np.where(ends, first, np.arange(len(pid)) + 1)
+    edges = np.unique(np.sort(np.column_stack([pid, pid[nxt]]), axis=1), axis=0)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    degree = np.bincount(edges.ravel(), minlength=n_points)
+    return degree > 2
+
+
+def _is_exterior(ring, ring_part):
+    return ring == 0 or ring_part[ring - 1] != ring_part[ring]
+
+
+def to_topojson(
+    gdf: gpd.GeoDataFrame,
+    columns: list[str] | None = None,
+    name: str = "layer",
+    quantization: int = 100_000,
+) -> dict:
+    """
+    Encodes a polygon layer as TopoJSON: boundaries shared by neighbouring
+    geometries are stored once as arcs, and coordinates are quantized to an
+    integer grid and delta encoded.
+
+    Parameters
+    ----------
+    gdf : gpd.GeoDataFrame
+        Polygon or MultiPolygon layer (e.g. census tracts), in the crs of the
+        output (EPSG:4326 for web maps).
+    columns : list[str], default None
+        Columns kept as feature properties (e.g. the key and value columns of
+        a choropleth). All non-geometry columns by default.
+    name : str, default "layer"
+        Name of the object in the topology.
+    quantization : int, default 100000
+        Number of grid positions along each axis of the layer bounds.
+
+    Returns
+    -------
+    topology:dict
+        TopoJSON topology with one GeometryCollection object.
+    """
+    geoms = gdf.geometry.values
+    parts, part_geom = shapely.get_parts(geoms, return_index=True)
+    if len(parts) and not (shapely.get_type_id(parts) == 3).all():
+        raise ValueError("Only Polygon and MultiPolygon layers can be encoded as TopoJSON")
+
+    bounds = gdf.total_bounds
+    qx, qy, ring_idx, ring_part, n_rings, scale, translate = _ring_points(
+        parts, bounds, quantization
+    )
+    keys, pid = np.unique(qx * quantization + qy, return_inverse=True)
+    junction = _junctions(pid, ring_idx, len(keys))
+
+    arcs, index = [], {}
+
+    def arc_ref(arc):
+        key = arc.tobytes()
+        if key in index:
+            return index[key]
+        reverse = arc[::-1].tobytes()
+        if reverse in index:
+            return ~index[reverse]
+        index[key] = len(arcs)
+        arcs.append(arc)
+        return index[key]
+
+    ring_arcs = [None] * n_rings
+    bounds_idx = np.flatnonzero(np.r_[True, ring_idx[1:] != ring_idx[:-1], True])
+    for start, end in zip(bounds_idx[:-1], bounds_idx[1:]):
+        ids = pid[start:end]
+        if len(ids) < 3:
+            # collapsed by quantization
+            continue
+        cuts = np.flatnonzero(junction[ids])
+        if not len(cuts):
+            # ring not split by neighbours: canonical start for shared rings (holes)
+            ids = np.roll(ids, -np.argmin(ids))
+            cuts = np.array([0])
+        else:
+            ids = np.roll(ids, -cuts[0])
+            cuts = cuts - cuts[0]
+        closed = np.r_[ids, ids[0]]
+        ring_arcs[ring_idx[start]] = [
+            arc_ref(closed[a : b + 1]) for a, b in zip(cuts, np.r_[cuts[1:], len(ids)])
+        ]
+
+    # polygons (rings by part, exterior first) and geometries (parts by feature)
+    polygons = [[] for _ in range(len(parts))]
+    for ring, part in enumerate(ring_part):
+        if ring_arcs[ring] is not None and (polygons[part] or _is_exterior(ring, ring_part)):
+            polygons[part].append(ring_arcs[ring])
+    features = [[] for _ in range(len(geoms))]
+    for part, feature in enumerate(part_geom):
+        if polygons[part]:
+            features[feature].append(polygons[part])
+
+    columns = [c for c in gdf.columns if c != gdf.geometry.name] if columns is None else columns
+    if columns:
+        properties = json.loads(pd.DataFrame(gdf[columns]).to_json(orient="records"))
+    else:
+        properties = [{}] * len(features)
+    geometries = []
+    for i, feature in enumerate(features):
+        if not feature:
+            geometry = {"type": None}
+        elif len(feature) == 1:
+            geometry = {"type": "Polygon", "arcs": feature[0]}
+        else:
+            geometry = {"type": "MultiPolygon", "arcs": feature}
+        geometry["properties"] = properties[i]
+        geometries.append(geometry)
+
+    xy = np.column_stack([keys // quantization, keys % quantization])
+    encoded = []
+    for arc in arcs:
+        points = xy[arc]
+        encoded.append(np.r_[points[:1], np.diff(points, axis=0)].tolist())
+
+    return {
+        "type": "Topology",
+        "bbox": [float(b) for b in bounds],
+        "transform": {"scale": scale, "translate": [float(t) for t in translate]},
+        "objects": {name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded,
+    }
+
+
+def write_topojson(
+    gdf: gpd.GeoDataFrame,
+    path: str,
+    columns: list[str] | None = None,
+    name: str = "layer",
+    quantization: int = 100_000,
+) -> str:
+    """
+    Writes a polygon layer as a TopoJSON file (see `to_topojson`).
+    """
+    with open(path, "w") as f:
+        json.dump(to_topojson(gdf, columns, name, quantization), f, separators=(",", ":"))
+    return path
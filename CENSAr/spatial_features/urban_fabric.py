@@ -7,7 +7,9 @@ import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 
 from CENSAr.spatial_features.utils import *
+from CENSAr.spatial_features.labels import label_points
 from CENSAr.datasources import *
+from CENSAr.profiling import profile
 
 #################################################
 ### Spatial distribution of census attributes ### 
@@ -54,6 +56,7 @@ class UrbanFeatures:
         self.thiner_area = thiner_area
         self.coarser_area = coarser_area
 
+    @profile()
     def spatial_dissimilarity(
             self, 
             idx_coarser_area: str, 
@@ -230,16 +233,11 @@ class UrbanFeatures:
                 ["{:.0f}%".format(x) for x in plt.gca().get_xticks()]
             )
 
-            def label_point(x, y, val, ax):
-                a = pd.concat({"x": x, "y": y, "val": val}, axis=1)
-                for i, point in a.iterrows():
-                    ax.text(point["x"] + 0.02, point["y"], str(point["val"]))
-
-            label_point(
-                coarser_dissim[pct_colname],
+            label_points(
+                plt.gca(),
+                coarser_dissim[pct_colname] + 0.02,
                 coarser_dissim[dissim_colname_100],
                 coarser_dissim.iloc[:, 0],
-                plt.gca(),
             )
 
             plt.tight_layout()
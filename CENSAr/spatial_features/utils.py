@@ -9,6 +9,10 @@ import geopandas as gpd
 import folium
 import mapclassify
 
+from CENSAr.simplification import plotting_layer
+from CENSAr.spatial_features.topology import to_topojson
+from CENSAr.spatial_features.labels import label_polygons
+
 def get_choroplet_colors(
     map: folium.folium.Map, 
     drop_continuos_bar: bool = True
@@ -236,7 +240,9 @@ def plot_matplotlib_dual_choroplet(
         thiner_area: gpd.GeoDataFrame, 
         cat_name: str, 
         coarser_area: gpd.GeoDataFrame, 
-        figsize: tuple[int, int] =(16,7)
+        figsize: tuple[int, int] =(16,7),
+        simplify: bool | float = True,
+        cull_labels: bool = False
     ):
     """
     Draws a two overlay choropleth map indicating spatial dissimilarity 
@@ -252,6 +258,11 @@ def plot_matplotlib_dual_choroplet(
         administrative subdivisions at a coarser area level (e.g. department)
     figsize: tuple[int, int]
         Figure size
+    simplify: bool | float, default True
+        Whether to draw geometries simplified to the size of one pixel
+        (see `CENSAr.simplification`). A number is used as tolerance.
+    cull_labels: bool, default False
+        Whether to skip coarser area labels overlapping another one
     
     Returns
     -------
@@ -262,19 +273,16 @@ def plot_matplotlib_dual_choroplet(
     fig = plt.figure(figsize=figsize)
     ax1 = fig.add_subplot(1,1,1)
 
+    thiner_area = plotting_layer(thiner_area, simplify=simplify, figsize=figsize)
+    coarser_area = plotting_layer(coarser_area, simplify=simplify, figsize=figsize)
     thiner_area.plot(column = cat_name,cmap='YlOrRd',ax=ax1, alpha = 0.9, legend=False)
     dissim_colname = f"dissim_idx_{cat_name}"
     coarser_area.plot(ax=ax1, column=dissim_colname, cmap = 'gist_yarg',edgecolor='grey', 
                 linewidth=0.6, alpha = 0.6, legend=True)
 
     props = dict(boxstyle='round', facecolor='linen', alpha=0.8)
-    for point in coarser_area.iterrows():
-        ax1.text(point[1]['geometry'].centroid.x,
-                point[1]['geometry'].centroid.y,
-                point[1]['grupo'],
-                horizontalalignment='center',
-                fontsize=10,
-                bbox=props) 
+    label_polygons(ax1, coarser_area, 'grupo', cull=cull_labels,
+                   horizontalalignment='center', fontsize=10, bbox=props)
 
     ax1.set_axis_off()
     
@@ -282,6 +290,14 @@ def plot_matplotlib_dual_choroplet(
     plt.close()
     return fig
 
+def _choroplet_geo_data(gdf, columns, name, geo_format, quantization):
+    # geometries embedded by a folium choroplet and their topojson object path
+    if geo_format == 'topojson':
+        return to_topojson(gdf, columns, name, quantization), f"objects.{name}"
+    elif geo_format == 'geojson':
+        return gdf[columns + [gdf.geometry.name]], None
+    raise ValueError(f"Unknown geo_format `{geo_format}`, use 'geojson' or 'topojson'")
+
 def plot_folium_dual_choroplet(
     cat_name: str,
     thiner_area: gpd.GeoDataFrame,
@@ -290,7 +306,10 @@ def plot_folium_dual_choroplet(
     coarser_area_name: str,
     map_height: int = 1000,
     bins_classificator: str = 'NaturalBreaks',
-    legend_builder: dict[bool,bool] = {'thiner_area':False, 'coarser_area':False}
+    legend_builder: dict[bool,bool] = {'thiner_area':False, 'coarser_area':False},
+    simplify: bool | float = True,
+    geo_format: str = 'geojson',
+    quantization: int = 100_000
     ):
     """
     Draws a two overlay choropleth map indicating spatial dissimilarity 
@@ -314,6 +333,16 @@ def plot_folium_dual_choroplet(
         Classification schema to be used to get data intervals
     legend_builder: dict[bool, bool]
         Wether to drop the default legebd bar and draw a new one for both choroplets
+    simplify: bool | float, default True
+        Whether to embed geometries simplified to the size of one pixel at the
+        initial zoom (see `CENSAr.simplification`). A number is used as
+        tolerance in degrees.
+    geo_format: str, default "geojson"
+        Format of the embedded geometries: "geojson" or "topojson" (shared
+        boundaries stored once and quantized coordinates, a much smaller html).
+        Either way only the key and value columns are embedded.
+    quantization: int, default 100000
+        Grid positions along each axis of the TopoJSON coordinates.
     
     Returns
     -------
@@ -327,6 +356,17 @@ def plot_folium_dual_choroplet(
     # Center base map
     zoom_value = 12
 
+    # folium draws EPSG:4326 geometries
+    thiner_area = plotting_layer(thiner_area, 4326, simplify, zoom=zoom_value)
+    coarser_area = plotting_layer(coarser_area, 4326, simplify, zoom=zoom_value)
+    dissim_colname = f"dissim_idx_{cat_name}"
+    thiner_geo, thiner_topo = _choroplet_geo_data(
+        thiner_area, [thiner_area_name, cat_name], "thiner_area", geo_format, quantization
+    )
+    coarser_geo, coarser_topo = _choroplet_geo_data(
+        coarser_area, [coarser_area_name, dissim_colname], "coarser_area", geo_format, quantization
+    )
+
     layer = folium.Map(
         location=coords,
         zoom_start=zoom_value,
@@ -354,8 +394,9 @@ def plot_folium_dual_choroplet(
     
     thiner_choroplet = folium.Choropleth(
         name="Radios censales",
-        geo_data=thiner_area,
-        data=thiner_area[[c for c in thiner_area.columns if c != "geometry"]],
+        geo_data=thiner_geo,
+        topojson=thiner_topo,
+        data=thiner_area[[thiner_area_name, cat_name]],
         columns=[thiner_area_name, cat_name],
         key_on="properties.{}".format(thiner_area_name),
         fill_color="YlOrRd",
@@ -388,7 +429,6 @@ def plot_folium_dual_choroplet(
     )
     
     # coarser area choroplet
-    dissim_colname = f"dissim_idx_{cat_name}"
     if bins_classificator == 'NaturalBreaks':
         qcut = mapclassify.NaturalBreaks(coarser_area[dissim_colname].values, k=4)
     elif bins_classificator == 'Percentiles':
@@ -403,8 +443,9 @@ def plot_folium_dual_choroplet(
 
     coarser_choroplet = folium.Choropleth(
         name=coarser_area_name.capitalize(),
-        geo_data=coarser_area,
-        data=coarser_area[[c for c in coarser_area.columns if c != "geometry"]],
+        geo_data=coarser_geo,
+        topojson=coarser_topo,
+        data=coarser_area[[coarser_area_name, dissim_colname]],
         columns=[coarser_area_name, dissim_colname],
         key_on="properties." + coarser_area_name,
         fill_color="Greys",
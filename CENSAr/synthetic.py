@@ -0,0 +1,219 @@
+import re
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from CENSAr.aggregation import ALL
+
+CRS = 5347
+
+
+def synthetic_tracts(n_tracts, cell=250.0, jitter=0.3, seed=1, crs=CRS, prov="18", depto="021"):
+    """
+    Returns a layer of census tract polygons covering a square city. Tracts are
+    quadrilaterals of a grid whose vertices are randomly moved, so neighbouring
+    tracts share their edges as census tracts do.
+
+    Parameters
+    ----------
+    n_tracts : int
+        Number of tracts (the first rows of the smallest square grid holding them).
+    cell : float, default 250.0
+        Grid spacing in meters.
+    jitter : float, default 0.3
+        Maximum vertex displacement as a fraction of `cell`.
+    seed : int, default 1
+        Random seed.
+    crs : int | str, default 5347
+        Projected coordinate reference system of the layer.
+    prov : str, default "18"
+        Province code used to build the tract links.
+    depto : str, default "021"
+        Department code used to build the tract links.
+
+    Returns
+    -------
+    tracts:gpd.GeoDataFrame
+        Tracts with `link` (prov + depto + fraction + radio) and `frac`
+        (fraction, the coarser area with ~25 tracts) columns.
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n_tracts)))
+    x, y = np.meshgrid(np.arange(side + 1) * cell, np.arange(side + 1) * cell)
+    x = x + rng.uniform(-jitter, jitter, x.shape) * cell
+    y = y + rng.uniform(-jitter, jitter, y.shape) * cell
+    vertices = np.stack([x, y], axis=-1)
+
+    # (rows, cols, 4 corners, xy) counterclockwise rings
+    rings = np.stack(
+        [vertices[:-1, :-1], vertices[:-1, 1:], vertices[1:, 1:], vertices[1:, :-1]], axis=2
+    ).reshape(-1, 4, 2)
+    polygons = shapely.polygons(np.concatenate([rings, rings[:, :1]], axis=1))
+
+    # fractions (coarser areas) are blocks of 5x5 tracts
+    rows, cols = np.divmod(np.arange(side * side), side)
+    frac = pd.Series((rows // 5) * int(np.ceil(side / 5)) + cols // 5 + 1)
+    radio = pd.Series((rows % 5) * 5 + cols % 5 + 1)
+    frac = prov + depto + frac.astype(str).str.zfill(max(2, len(str(frac.max()))))
+    link = frac + radio.astype(str).str.zfill(2)
+
+    tracts = gpd.GeoDataFrame(
+        {"link": link, "frac": frac},
+        geometry=polygons,
+        crs=crs,
+    )
+    return tracts.iloc[:n_tracts].reset_index(drop=True)
+
+
+def _spatial_field(tracts, rng, scale=0.15):
+    # smooth random field over the city: gaussian bumps around a few centers
+    centroids = shapely.get_coordinates(tracts.geometry.centroid.values)
+    lo, hi = centroids.min(axis=0), centroids.max(axis=0)
+    centers = rng.uniform(lo, hi, (5, 2))
+    radius = (hi - lo).max() * scale
+    dist = np.linalg.norm(centroids[:, None, :] - centers[None], axis=-1)
+    return np.exp(-((dist / radius) ** 2)).sum(axis=1)
+
+
+def category_columns(name):
+    """
+    Returns the census table columns (REDATAM names) behind a named aggregation
+    of the `hogares.yaml`/`viviendas.yaml` catalogs. Regex mappings get one
+    column matching their pattern.
+    """
+    columns = {}
+    for mapping in ALL[name].mapping:
+        names = list(mapping.columns)
+        for pattern in mapping.regex:
+            column = re.sub(r"[\^\$\*\+\?\.\[\]\(\)\\|]", "", pattern).strip()
+            if not re.match(pattern, column):
+                raise ValueError(f"Can not build a column matching `{pattern}`")
+            names.append(column)
+        columns[mapping.name] = names
+    return columns
+
+
+def synthetic_table(tracts, name="tipo vivienda particular", size=120, seed=1):
+    """
+    Returns a census table by tract (REDATAM shaped) with the columns behind a
+    named aggregation.
+
+    Parameters
+    ----------
+    tracts : gpd.GeoDataFrame
+        Tracts layer with a `link` column.
+    name : str, default "tipo vivienda particular"
+        Named aggregation whose source columns are generated.
+    size : int, default 120
+        Mean number of units (households or dwellings) by tract.
+    seed : int, default 1
+        Random seed.
+
+    Returns
+    -------
+    table:pd.DataFrame
+        `link`, one column by census category and `total`. The first mapping
+        of the aggregation (e.g. formal) takes most of the units and the
+        remaining ones are spatially clustered (e.g. informal settlements).
+    """
+    rng = np.random.default_rng(seed)
+    groups = category_columns(name)
+    field = _spatial_field(tracts, rng)
+    field = field / field.mean()
+
+    table = pd.DataFrame({"link": tracts["link"].to_numpy()})
+    totals = rng.poisson(size, len(tracts))
+    for n, (group, columns) in enumerate(groups.items()):
+        share = 0.9 if n == 0 else 0.1 / (len(groups) - 1) * field
+        for column in columns:
+            table[column] = rng.binomial(totals, np.clip(share / len(columns), 0, 1))
+    table["total"] = table.drop(columns="link").sum(axis=1)
+    return table
+
+
+def synthetic_footprint(tracts, share=0.6, seed=1):
+    """
+    Returns an urban footprint polygon covering roughly `share` of the city
+    (the shape of the rasterdata module outputs).
+    """
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = tracts.total_bounds
+    center = shapely.Point((xmin + xmax) / 2, (ymin + ymax) / 2)
+    radius = np.sqrt(share * (xmax - xmin) * (ymax - ymin) / np.pi)
+    angles = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    radii = radius * rng.uniform(0.85, 1.15, len(angles))
+    ring = np.column_stack(
+        [center.x + radii * np.cos(angles), center.y + radii * np.sin(angles)]
+    )
+    return gpd.GeoDataFrame({"class": [1]}, geometry=[shapely.Polygon(ring)], crs=tracts.crs)
+
+
+def synthetic_settlements(tracts, n_settlements=50, size=0.5, seed=1):
+    """
+    Returns informal settlement polygons (the shape of the RENABAP layer), with
+    an `id_renabap` column.
+
+    Parameters
+    ----------
+    tracts : gpd.GeoDataFrame
+        Tracts layer used to place the settlements.
+    n_settlements : int, default 50
+        Number of settlements.
+    size : float, default 0.5
+        Mean settlement radius as a fraction of the mean tract side.
+    seed : int, default 1
+        Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    xmin, ymin, xmax, ymax = tracts.total_bounds
+    side = np.sqrt(tracts.geometry.area.mean())
+    points = shapely.points(
+        rng.uniform(xmin, xmax, n_settlements), rng.uniform(ymin, ymax, n_settlements)
+    )
+    radii = rng.gamma(2, size / 2, n_settlements) * side
+    return gpd.GeoDataFrame(
+        {"id_renabap": np.arange(1, n_settlements + 1)},
+        geometry=shapely.buffer(points, radii, quad_segs=4),
+        crs=tracts.crs,
+    )
+
+
+def synthetic_city(n_tracts, seed=1):
+    """
+    Returns a synthetic city with the inputs of the scenario pipelines.
+
+    Parameters
+    ----------
+    n_tracts : int
+        Approximate number of tracts.
+    seed : int, default 1
+        Random seed.
+
+    Returns
+    -------
+    city:dict
+        `tracts_2001`, `tracts_2010` and `tracts_2020` layers (different
+        vertex jitter, so they only overlap partially), `tipo_2001` and
+        `tipo_2010` tables of the "tipo vivienda particular" categories,
+        `footprints` by year and informal `settlements`.
+    """
+    tracts = {
+        year: synthetic_tracts(n_tracts, seed=seed + n)
+        for n, year in enumerate((2001, 2010, 2020))
+    }
+    tables = {
+        year: synthetic_table(tracts[year], seed=seed + n, size=100 + 20 * n)
+        for n, year in enumerate((2001, 2010))
+    }
+    footprints = {
+        year: synthetic_footprint(tracts[2010], share=0.5 + 0.1 * n, seed=seed + n)
+        for n, year in enumerate((2001, 2010, 2020))
+    }
+    return {
+        **{f"tracts_{year}": gdf for year, gdf in tracts.items()},
+        **{f"tipo_{year}": table for year, table in tables.items()},
+        "footprints": footprints,
+        "settlements": synthetic_settlements(tracts[2010], n_settlements=max(n_tracts // 50, 1), seed=seed),
+    }
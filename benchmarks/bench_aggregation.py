@@ -0,0 +1,19 @@
+from CENSAr.aggregation import ALL, aggregate
+from CENSAr.synthetic import synthetic_table, synthetic_tracts
+
+
+class Aggregate:
+    params = [1_000, 10_000, 100_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        tracts = synthetic_tracts(n_tracts)
+        self.table = synthetic_table(tracts)
+        self.schema = ALL["tipo vivienda particular"].mapping
+
+    def time_aggregate(self, n_tracts):
+        aggregate(self.table, self.schema)
+
+    def peakmem_aggregate(self, n_tracts):
+        aggregate(self.table, self.schema)
+
@@ -0,0 +1,32 @@
+from CENSAr.aggregation import named_aggregation
+from CENSAr.clustering.geo_utils import compute_weights
+from CENSAr.clustering.moran import lisa, lisa_bv_batch
+from CENSAr.synthetic import synthetic_table, synthetic_tracts
+
+
+class Weights:
+    params = ([1_000, 10_000, 50_000], ["queen", "rook", "knn"])
+    param_names = ["n_tracts", "weights"]
+
+    def setup(self, n_tracts, weights):
+        self.tracts = synthetic_tracts(n_tracts)
+
+    def time_compute_weights(self, n_tracts, weights):
+        compute_weights(self.tracts, weights=weights)
+
+
+class Lisa:
+    params = [1_000, 10_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        tracts = synthetic_tracts(n_tracts)
+        table = named_aggregation(synthetic_table(tracts), "tipo vivienda particular")
+        self.gdf = tracts.merge(table, on="link")
+        self.w = compute_weights(self.gdf)
+
+    def time_lisa(self, n_tracts):
+        lisa(self.gdf, ["informal"], w=self.w)
+
+    def time_lisa_bv_batch(self, n_tracts):
+        lisa_bv_batch(self.gdf, ["informal", "formal"], ["total"], w=self.w, seed=1)
@@ -0,0 +1,62 @@
+from CENSAr.spatial_distributions.geo_utils import build_thiner_pct_in_coarser_geom
+from CENSAr.spatial_distributions.modeling_tools import (
+    distribute_totals_tract,
+    ensemble_totals_tract,
+    tracts_2020_to_2010,
+)
+from CENSAr.synthetic import (
+    synthetic_settlements,
+    synthetic_table,
+    synthetic_tracts,
+)
+
+
+class DistributeTotals:
+    params = [1_000, 10_000, 100_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        tracts = synthetic_tracts(n_tracts)
+        self.gdf = tracts.merge(synthetic_table(tracts), on="link").set_index("link")
+        self.tot_var = int(self.gdf["total"].sum() * 1.2)
+
+    def time_distribute_totals_tract(self, n_tracts):
+        distribute_totals_tract(
+            tot_var=self.tot_var, weights=None, catname="total", forecast_year="2020", gdf=self.gdf
+        )
+
+    def time_ensemble_100(self, n_tracts):
+        ensemble_totals_tract(
+            tot_var=self.tot_var, weights=None, gdf=self.gdf, n_realizations=100, catname="total"
+        )
+
+
+class CalibrationOverlay:
+    params = [1_000, 10_000, 100_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        self.tracts = synthetic_tracts(n_tracts)
+        self.settlements = synthetic_settlements(self.tracts, n_settlements=max(n_tracts // 50, 1))
+
+    def time_build_thiner_pct_in_coarser_geom(self, n_tracts):
+        build_thiner_pct_in_coarser_geom(
+            coarser_geom=self.tracts,
+            thiner_geom=self.settlements,
+            coarser_idx="link",
+            thiner_idx="id_renabap",
+            crs=self.tracts.crs,
+            coarser_tot=False,
+        )
+
+
+class TractsMatching:
+    params = [1_000, 10_000, 100_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        self.tracts_2010 = synthetic_tracts(n_tracts, seed=1)
+        self.tracts_2020 = synthetic_tracts(n_tracts, seed=2)
+
+    def time_tracts_2020_to_2010(self, n_tracts):
+        tracts_2020_to_2010(self.tracts_2020.copy(), self.tracts_2010)
@@ -0,0 +1,20 @@
+from CENSAr.aggregation import ALL, aggregate
+from CENSAr.spatial_features.urban_fabric import UrbanFeatures
+from CENSAr.synthetic import synthetic_table, synthetic_tracts
+
+
+class SpatialDissimilarity:
+    params = [1_000, 10_000, 100_000]
+    param_names = ["n_tracts"]
+
+    def setup(self, n_tracts):
+        tracts = synthetic_tracts(n_tracts)
+        table = synthetic_table(tracts)
+        thiner = tracts.merge(aggregate(table, ALL["tipo vivienda particular"].mapping), on="link")
+        coarser = tracts.dissolve("frac").reset_index()[["frac", "geometry"]]
+        self.city = UrbanFeatures(thiner_area=thiner, coarser_area=coarser)
+
+    def time_spatial_dissimilarity(self, n_tracts):
+        self.city.spatial_dissimilarity(
+            idx_coarser_area="frac", var_name="total", cat_name="informal"
+        )
@@ -28,5 +28,5 @@ setup(
         ],
     include_package_data=True,
     package_dir={'CENSAr':'CENSAr/'},
-    package_data={'CENSAr': ['aggregation/*.yaml']}
+    package_data={'CENSAr': ['aggregation/*.yaml', 'scenarios/*.yaml']}
 )